@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/2.1/ref/settings/
 """
 
+import importlib.util
 import os
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
@@ -20,12 +21,18 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # See https://docs.djangoproject.com/en/2.1/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 't3-%u966xhs+m_&q31r)r8p3z%4zqf$@1zq9ysr)8-cuizz3o#'
+SECRET_KEY = os.environ.get(
+    'SECRET_KEY',
+    't3-%u966xhs+m_&q31r)r8p3z%4zqf$@1zq9ysr)8-cuizz3o#'
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# DEBUG also makes Django keep every executed SQL query in memory.
+DEBUG = bool(int(os.environ.get('DEBUG', 0)))
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [
+    host for host in os.environ.get('ALLOWED_HOSTS', '').split(',') if host
+]
 
 
 # Application definition
@@ -37,6 +44,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'user',
@@ -45,6 +53,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,15 +89,72 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # Seconds to keep a connection open between requests; 0 closes it
+        # after each request, which is what the pool below expects.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': bool(
+            int(os.environ.get('DB_CONN_HEALTH_CHECKS', 1))
+        ),
+        'POOL_SIZE': int(os.environ.get('DB_POOL_SIZE', 0)),
+        'POOL_TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        # Required behind PgBouncer in transaction pooling mode.
+        'DISABLE_SERVER_SIDE_CURSORS': bool(
+            int(os.environ.get('DB_DISABLE_SERVER_SIDE_CURSORS', 0))
+        ),
     }
 }
 
 
+# Caches
+# CACHE_LOCATION names memcached servers (host:port, comma separated)
+# shared by every worker. Without it each process has its own local
+# memory cache, which cannot hold state workers must agree on, such as
+# replica pins.
+
+CACHE_LOCATION = os.environ.get('CACHE_LOCATION')
+if CACHE_LOCATION:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': CACHE_LOCATION.split(','),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
+# Read replicas, one alias per host in DB_REPLICA_HOSTS. Tests run them as
+# mirrors of the default database.
+for index, host in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica_{index}'] = dict(
+        DATABASES['default'], HOST=host, TEST={'MIRROR': 'default'}
+    )
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# round_robin or least_lag
+REPLICA_SELECTION = os.environ.get('DB_REPLICA_SELECTION', 'round_robin')
+REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG', 10))
+REPLICA_LAG_CHECK_INTERVAL = int(
+    os.environ.get('DB_REPLICA_LAG_CHECK_INTERVAL', 5)
+)
+# Seconds a user reads from the primary after writing. Pins must be seen
+# by every worker, so replicas are only used when this cache is shared.
+REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', 5))
+REPLICA_PIN_CACHE_ALIAS = 'default'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -107,6 +173,41 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# PASSWORD_HASHER picks the hasher of new passwords: argon2, bcrypt or
+# pbkdf2. Passwords hashed by the others still verify and are rehashed on
+# the next login. argon2 and bcrypt need argon2-cffi and bcrypt installed.
+_PASSWORD_HASHERS = {
+    'argon2': 'core.hashing.Argon2PasswordHasher',
+    'bcrypt': 'core.hashing.BCryptSHA256PasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHER = os.environ.get(
+    'PASSWORD_HASHER',
+    'argon2' if importlib.util.find_spec('argon2') else 'pbkdf2'
+)
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    path for name, path in _PASSWORD_HASHERS.items()
+    if name != PASSWORD_HASHER
+]
+PASSWORD_ARGON2_TIME_COST = int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 2))
+PASSWORD_ARGON2_MEMORY_COST = int(
+    os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 512)
+)
+PASSWORD_ARGON2_PARALLELISM = int(
+    os.environ.get('PASSWORD_ARGON2_PARALLELISM', 1)
+)
+PASSWORD_BCRYPT_ROUNDS = int(os.environ.get('PASSWORD_BCRYPT_ROUNDS', 12))
+
+# At most PASSWORD_HASH_CONCURRENCY hashes run at once per process (0 for
+# no limit) with at most PASSWORD_HASH_QUEUE more waiting.
+PASSWORD_HASH_CONCURRENCY = int(
+    os.environ.get('PASSWORD_HASH_CONCURRENCY', os.cpu_count() or 1)
+)
+PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 32))
+
+AUTHENTICATION_BACKENDS = ['user.backends.PooledHashBackend']
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/2.1/topics/i18n/
@@ -132,4 +233,108 @@ MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
 
-AUTH_USER_MODEL = 'core.User'
\ No newline at end of file
+AUTH_USER_MODEL = 'core.User'
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+# JSON is encoded and decoded with orjson when it is installed. With
+# msgpack installed, clients may also send and accept application/msgpack.
+
+API_RENDERER_CLASSES = [
+    'core.renderers.ORJSONRenderer',
+    'rest_framework.renderers.BrowsableAPIRenderer',
+]
+API_PARSER_CLASSES = [
+    'core.parsers.ORJSONParser',
+    'rest_framework.parsers.FormParser',
+    'rest_framework.parsers.MultiPartParser',
+]
+if importlib.util.find_spec('msgpack'):
+    API_RENDERER_CLASSES.append('core.renderers.MessagePackRenderer')
+    API_PARSER_CLASSES.append('core.parsers.MessagePackParser')
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 50)),
+    'DEFAULT_RENDERER_CLASSES': API_RENDERER_CLASSES,
+    'DEFAULT_PARSER_CLASSES': API_PARSER_CLASSES,
+}
+
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 500))
+API_BULK_MAX_ITEMS = int(os.environ.get('API_BULK_MAX_ITEMS', 1000))
+
+# Recipe lists and details are read with values() and built as dicts
+# instead of through the serializers, which produce the same output.
+RECIPE_VALUES_READS = bool(int(os.environ.get('RECIPE_VALUES_READS', 1)))
+
+
+# Token authentication cache
+# Resolved tokens are kept for AUTH_TOKEN_CACHE_TTL seconds in the
+# AUTH_TOKEN_CACHE_ALIAS cache (empty to disable), where deleting a token
+# or saving its user drops them for every worker. It must be shared by
+# every worker, so it is only enabled by default with CACHE_LOCATION and
+# the system check reports a local one. An in-process tier of
+# up to AUTH_TOKEN_CACHE_MAX_SIZE entries can be enabled with
+# AUTH_TOKEN_LOCAL_CACHE_TTL; other workers' changes only reach it once
+# its entries expire, so a revoked token keeps working that long.
+
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get('AUTH_TOKEN_CACHE_TTL', 60))
+AUTH_TOKEN_CACHE_ALIAS = os.environ.get(
+    'AUTH_TOKEN_CACHE_ALIAS', 'default' if CACHE_LOCATION else ''
+)
+AUTH_TOKEN_LOCAL_CACHE_TTL = int(
+    os.environ.get('AUTH_TOKEN_LOCAL_CACHE_TTL', 0)
+)
+AUTH_TOKEN_CACHE_MAX_SIZE = int(
+    os.environ.get('AUTH_TOKEN_CACHE_MAX_SIZE', 10000)
+)
+
+
+# Recipe images
+# Uploads are streamed to a temporary file instead of being held in memory.
+# Each upload gets a derivative per RECIPE_IMAGE_DERIVATIVES entry, bounded
+# to the given number of pixels on its longest side.
+
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+RECIPE_IMAGE_DERIVATIVES = {
+    'thumbnail': 160,
+    'card': 480,
+    'full': 1600,
+}
+RECIPE_IMAGE_ASYNC = True
+RECIPE_IMAGE_WORKERS = int(os.environ.get('RECIPE_IMAGE_WORKERS', 2))
+
+
+# Recipe response cache
+# List and detail responses are cached per user and collection version;
+# entries of older versions are never read again and expire after the
+# timeout.
+
+RECIPE_RESPONSE_CACHE_ALIAS = 'default'
+RECIPE_RESPONSE_CACHE_TIMEOUT = int(
+    os.environ.get('RECIPE_RESPONSE_CACHE_TIMEOUT', 300)
+)
+
+
+# Recipe export
+# Rows are read and written in chunks of RECIPE_EXPORT_CHUNK_SIZE recipes.
+
+RECIPE_EXPORT_CHUNK_SIZE = int(
+    os.environ.get('RECIPE_EXPORT_CHUNK_SIZE', 2000)
+)
+
+
+
+# Recipe search
+# Text search configuration used for the stored recipe search vectors and
+# for parsing ?search= queries.
+
+RECIPE_SEARCH_CONFIG = 'english'
+
+# Request metrics
+# Share of requests whose queries and serializers are timed.
+METRICS_SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', 0.1))
+METRICS_SERVER_TIMING = bool(int(os.environ.get('METRICS_SERVER_TIMING', 1)))
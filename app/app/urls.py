@@ -3,9 +3,13 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core.views import DatabaseStatsView, MetricsView
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/user/', include('user.urls')),
     path('api/recipe/', include('recipe.urls')),
+    path('metrics', MetricsView.as_view(), name='metrics'),
+    path('db-stats', DatabaseStatsView.as_view(), name='db-stats'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.core import checks
+
+        from core import routers, signals  # noqa
+
+        checks.register(routers.check_pin_cache)
@@ -0,0 +1,204 @@
+"""
+PostgreSQL backend with connection health checks and optional pooling.
+
+Settings read from the ``DATABASES`` entry on top of Django's own:
+
+* ``CONN_HEALTH_CHECKS``: check a reused connection with ``SELECT 1``
+  before its first query and reconnect when the check fails.
+* ``POOL_SIZE``: keep up to this many connections per process in a pool
+  shared by all threads; 0 disables the pool. Pair it with
+  ``CONN_MAX_AGE = 0`` so connections go back to the pool after each
+  request.
+* ``POOL_TIMEOUT``: seconds to wait for a free pooled connection.
+"""
+import threading
+import time
+
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base, creation
+
+from core import metrics
+from core.backends.postgresql.pool import ConnectionPool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionStats:
+    """process wide counters about opening, reusing and releasing
+    connections, also recorded in the request metrics"""
+
+    FIELDS = (
+        'opened', 'reused', 'released', 'health_check_failures',
+        'pool_waits', 'pool_wait_seconds', 'pool_wait_max_seconds',
+        'connection_age_seconds', 'connection_age_max_seconds',
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._values = dict.fromkeys(self.FIELDS, 0)
+
+    def _add(self, name, value=1):
+        self._values[name] += value
+        metrics.registry.inc(f'db_connections_{name}_total', {}, value)
+
+    def _max(self, name, value):
+        self._values[name] = max(self._values[name], value)
+        metrics.registry.set_max(
+            f'db_connections_{name}', {}, self._values[name]
+        )
+
+    def connected(self, reused, waited=None):
+        with self._lock:
+            self._add('reused' if reused else 'opened')
+            if waited is not None:
+                self._add('pool_waits')
+                self._add('pool_wait_seconds', waited)
+                self._max('pool_wait_max_seconds', waited)
+
+    def disconnected(self, age):
+        with self._lock:
+            self._add('released')
+            self._add('connection_age_seconds', age)
+            self._max('connection_age_max_seconds', age)
+
+    def health_check_failed(self):
+        with self._lock:
+            self._add('health_check_failures')
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+
+stats = ConnectionStats()
+
+
+def get_pool(alias, conn_params, settings_dict):
+    """return the pool for a database alias and its connection
+    parameters, or None when pooling is off"""
+    size = settings_dict.get('POOL_SIZE') or 0
+    if size <= 0 or alias == NO_DB_ALIAS:
+        return None
+
+    key = (alias, tuple(sorted(conn_params.items())))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(
+                size, settings_dict.get('POOL_TIMEOUT', 10)
+            )
+        return _pools[key]
+
+
+def close_pools():
+    """close the idle connections of every pool"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.clear()
+
+
+def pool_stats():
+    """return the size and idle count of each pool by alias"""
+    with _pools_lock:
+        pools = list(_pools.items())
+
+    result = {}
+    for (alias, _), pool in pools:
+        current = result.setdefault(alias, {'size': 0, 'idle': 0})
+        for name, value in pool.stats().items():
+            current[name] += value
+    return result
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Pooled connections would keep the test database in use.
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pool = None
+        self._connected_at = None
+        self._reused = False
+        self._health_check_pending = False
+        self._discard = False
+
+    def get_new_connection(self, conn_params):
+        self._pool = get_pool(self.alias, conn_params, self.settings_dict)
+        if self._pool is None:
+            connection = super().get_new_connection(conn_params)
+            self._connected_at = time.monotonic()
+            self._reused = False
+            stats.connected(reused=False)
+            return connection
+
+        connection, self._connected_at, self._reused, waited = \
+            self._pool.acquire(
+                lambda: super(DatabaseWrapper, self).get_new_connection(
+                    conn_params
+                )
+            )
+        if self._reused:
+            self.isolation_level = self.settings_dict['OPTIONS'].get(
+                'isolation_level', connection.isolation_level
+            )
+        stats.connected(reused=self._reused, waited=waited)
+        return connection
+
+    def connect(self):
+        self._discard = False
+        super().connect()
+        self._health_check_pending = self._reused
+
+    def ensure_connection(self):
+        super().ensure_connection()
+        if self._health_check_pending:
+            self._health_check_pending = False
+            if self._check_health():
+                return
+            super().ensure_connection()
+
+    def _check_health(self):
+        """return whether the connection answers, closing it if not"""
+        if (not self.settings_dict.get('CONN_HEALTH_CHECKS') or
+                self.in_atomic_block or self.is_usable()):
+            return True
+
+        stats.health_check_failed()
+        self._discard = True
+        self.close()
+        return False
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        # A connection kept across requests may have been dropped by the
+        # server or a pooler in the meantime.
+        if self.connection is not None:
+            self._health_check_pending = True
+
+    def _close(self):
+        if self.connection is None:
+            return
+        stats.disconnected(time.monotonic() - self._connected_at)
+        if self._pool is None:
+            return super()._close()
+
+        with self.wrap_database_errors:
+            self._pool.release(
+                self.connection,
+                self._connected_at,
+                # Another thread must not get a connection that this one
+                # still holds inside an atomic block.
+                discard=self._discard or self.in_atomic_block,
+            )
@@ -0,0 +1,86 @@
+import collections
+import threading
+import time
+
+import psycopg2
+from psycopg2 import extensions
+
+
+class ConnectionPool:
+    """a bounded, thread safe pool of open psycopg2 connections
+
+    Callers block for at most ``timeout`` seconds when every connection
+    is checked out. Idle connections are handed out most recently used
+    first so the hot ones stay warm and the rest can age out server side.
+    """
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = collections.deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, connect):
+        """return a (connection, created_at, reused, waited) tuple
+
+        ``connect`` opens a new connection when none is idle. ``waited``
+        is the seconds spent blocked until a connection was free, None
+        when one was free at once.
+        """
+        waited = None
+        if not self._slots.acquire(blocking=False):
+            start = time.monotonic()
+            if not self._slots.acquire(timeout=self.timeout):
+                raise psycopg2.OperationalError(
+                    f'no database connection free after {self.timeout}s'
+                )
+            waited = time.monotonic() - start
+
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    connection, created_at = self._idle.pop()
+                if not connection.closed:
+                    return connection, created_at, True, waited
+
+            return connect(), time.monotonic(), False, waited
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection, created_at, discard=False):
+        """return a connection to the pool, closing it if it is unusable"""
+        try:
+            if not discard and not connection.closed:
+                status = connection.get_transaction_status()
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    discard = True
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    try:
+                        connection.rollback()
+                    except psycopg2.Error:
+                        discard = True
+
+            if discard or connection.closed:
+                if not connection.closed:
+                    connection.close()
+            else:
+                with self._lock:
+                    self._idle.append((connection, created_at))
+        finally:
+            self._slots.release()
+
+    def clear(self):
+        """close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, collections.deque()
+        for connection, created_at in idle:
+            connection.close()
+
+    def stats(self):
+        """return the size of the pool and its idle connection count"""
+        with self._lock:
+            return {'size': self.size, 'idle': len(self._idle)}
@@ -0,0 +1,106 @@
+"""
+Admission control for password hashing.
+
+Hashes run on the calling request thread, which stays busy for the whole
+hash; limiting them frees no threads. What run() limits is how many
+hashes, CPU and, with argon2, memory bound, a process computes at once:
+at most PASSWORD_HASH_CONCURRENCY run together, at most
+PASSWORD_HASH_QUEUE more callers wait for a slot, and past that callers
+get HashingBusy at once instead of queueing behind a login storm.
+"""
+import threading
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+_admitted = None
+_running = None
+_lock = threading.Lock()
+
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many logins in progress, try again shortly.'
+    default_code = 'hashing_busy'
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """argon2 with its costs taken from the settings"""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class BCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher):
+    """bcrypt with its work factor taken from the settings"""
+
+    @property
+    def rounds(self):
+        return settings.PASSWORD_BCRYPT_ROUNDS
+
+
+def _slots():
+    global _admitted, _running
+    with _lock:
+        if _running is None:
+            _running = threading.BoundedSemaphore(
+                settings.PASSWORD_HASH_CONCURRENCY
+            )
+            _admitted = threading.BoundedSemaphore(
+                settings.PASSWORD_HASH_CONCURRENCY +
+                settings.PASSWORD_HASH_QUEUE
+            )
+        return _admitted, _running
+
+
+def run(function, *args):
+    """return function(*args), run once a hashing slot is free"""
+    if settings.PASSWORD_HASH_CONCURRENCY <= 0:
+        return function(*args)
+
+    admitted, running = _slots()
+    if not admitted.acquire(blocking=False):
+        raise HashingBusy()
+    try:
+        with running:
+            return function(*args)
+    finally:
+        admitted.release()
+
+
+def make_password(password):
+    """return the hash of a password, or an unusable one for None"""
+    return run(hashers.make_password, password)
+
+
+def check_password(user, password):
+    """return whether the password is the user's
+
+    A correct password stored with another hasher or older costs than
+    the preferred hasher's is rehashed and saved.
+    """
+    encoded = user.password
+    if not run(hashers.check_password, password, encoded):
+        return False
+
+    preferred = hashers.get_hasher('default')
+    hasher = hashers.identify_hasher(encoded)
+    if hasher.algorithm != preferred.algorithm or \
+            preferred.must_update(encoded):
+        user.password = make_password(password)
+        user.save(update_fields=['password'])
+
+    return True
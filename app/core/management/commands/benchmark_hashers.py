@@ -0,0 +1,66 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+
+class Command(BaseCommand):
+    """Django command comparing password verification throughput
+
+    Every configured hasher verifies the same password in a loop, first
+    on one thread and then on --threads threads, which shows how far
+    concurrent hashing scales on this machine.
+    """
+    help = 'Benchmark password verification per hasher'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=2)
+        parser.add_argument(
+            '--threads', type=int,
+            default=max(settings.PASSWORD_HASH_CONCURRENCY, 1)
+        )
+
+    def handle(self, *args, **options):
+        cores = os.cpu_count() or 1
+        threads = options['threads']
+        self.stdout.write(f'{cores} cores, {threads} threads')
+
+        for path in settings.PASSWORD_HASHERS:
+            hasher = import_string(path)()
+            try:
+                encoded = hasher.encode('benchmark', hasher.salt())
+            except ValueError as exc:
+                self.stdout.write(f'{hasher.algorithm:>16}: skipped ({exc})')
+                continue
+
+            single = self._rate(hasher, encoded, 1, options['duration'])
+            pooled = self._rate(
+                hasher, encoded, threads, options['duration']
+            )
+            self.stdout.write(
+                f'{hasher.algorithm:>16}: {1000 / single:7.2f} ms/login  '
+                f'{single:8.1f} logins/s on 1 thread  '
+                f'{pooled:8.1f} logins/s on {threads}  '
+                f'{pooled / min(threads, cores):8.1f} logins/s per core'
+            )
+
+    def _rate(self, hasher, encoded, threads, duration):
+        """return the verifications per second over all threads"""
+        deadline = time.perf_counter() + duration
+
+        def verify():
+            count = 0
+            while time.perf_counter() < deadline:
+                hasher.verify('benchmark', encoded)
+                count += 1
+            return count
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as executor:
+            counts = [executor.submit(verify) for _ in range(threads)]
+            total = sum(future.result() for future in counts)
+
+        return total / (time.perf_counter() - start)
@@ -1,21 +1,96 @@
+import random
 import time
 
-from django.db import connections
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
     """Django commmand to pause execution untill the datebase is available"""
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database alias to wait for.',
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=60,
+            help='Seconds to wait in total before giving up.',
+        )
+        parser.add_argument(
+            '--initial-delay', type=float, default=0.1,
+            help='Upper bound of the first wait between attempts.',
+        )
+        parser.add_argument(
+            '--max-delay', type=float, default=5,
+            help='Upper bound of any wait between attempts.',
+        )
+        parser.add_argument(
+            '--check-migrations', action='store_true',
+            help='Also wait until every migration has been applied.',
+        )
+
+    def probe(self, alias):
+        """run a query on the database, raising if it is unreachable"""
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except OperationalError:
+            # Drop a connection the server broke off so the next attempt
+            # reconnects.
+            if connection.connection is not None and \
+                    not connection.is_usable():
+                connection.close()
+            raise
+
+    def unapplied_migrations(self, alias):
+        """return the migrations that still have to be applied"""
+        executor = MigrationExecutor(connections[alias])
+        return executor.migration_plan(executor.loader.graph.leaf_nodes())
+
     def handle(self, *args, **options):
+        alias = options['database']
+        start = time.monotonic()
+        deadline = start + options['timeout']
+        attempt = 0
+
         self.stdout.write('Waiting for database..')
-        db_conn = None
-        while not db_conn:
+        while True:
+            attempt += 1
             try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stdout.write('Database unavailable! waiting 1 second!')
-                time.sleep(1)
+                self.probe(alias)
+            except OperationalError as exc:
+                reason = 'Database unavailable ({})'.format(
+                    ' '.join(str(exc).split())
+                )
+            else:
+                pending = options['check_migrations'] and \
+                    self.unapplied_migrations(alias)
+                if not pending:
+                    break
+                reason = f'{len(pending)} migrations not applied'
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise CommandError(
+                    f'{reason}; gave up after {attempt} attempts in '
+                    f'{time.monotonic() - start:.2f}s'
+                )
+
+            # Full jitter keeps a fleet of starting containers from
+            # retrying in lockstep.
+            ceiling = min(
+                options['max_delay'],
+                options['initial_delay'] * 2 ** (attempt - 1),
+            )
+            delay = min(random.uniform(0, ceiling), remaining)
+            self.stdout.write(f'{reason}! waiting {delay:.2f} seconds!')
+            time.sleep(delay)
 
-        self.stdout.write(self.style.SUCCESS("Database available yehey!"))
+        self.stdout.write(self.style.SUCCESS(
+            f'Database available yehey! ({attempt} attempts in '
+            f'{time.monotonic() - start:.2f}s)'
+        ))
@@ -0,0 +1,255 @@
+"""
+Per route request metrics in the Prometheus text format.
+
+Every request adds its latency, status and response size to the counters
+of its route, the URL name such as ``recipe:recipe-list``. A sample of
+``METRICS_SAMPLE_RATE`` requests is also instrumented in depth: their SQL
+queries are counted and timed through a connection execute wrapper, the
+time spent in serializers is measured and, with ``METRICS_SERVER_TIMING``,
+the figures are returned in a ``Server-Timing`` header.
+
+Values are kept by prometheus_client. When ``PROMETHEUS_MULTIPROC_DIR``
+is set, as gunicorn.conf.py does, every worker writes them to files in
+that directory and a scrape of any worker reports the sum of all of them.
+"""
+import os
+import random
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+import prometheus_client
+from prometheus_client import multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+CONTENT_TYPE = prometheus_client.CONTENT_TYPE_LATEST
+
+MULTIPROC_DIR_ENV = 'PROMETHEUS_MULTIPROC_DIR'
+
+_state = threading.local()
+_collectors = []
+
+
+class Registry:
+    """the counters, histograms and gauges of the API, created on first
+    use from their name and label names"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._registry = prometheus_client.CollectorRegistry()
+            self._metrics = {}
+
+    def _get(self, kind, name, labels, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = kind(
+                    name, name.replace('_', ' '), list(labels),
+                    registry=self._registry, **kwargs
+                )
+        return metric.labels(**labels) if labels else metric
+
+    def inc(self, name, labels, value=1):
+        self._get(prometheus_client.Counter, name, labels).inc(value)
+
+    def observe(self, name, labels, value, buckets):
+        self._get(
+            prometheus_client.Histogram, name, labels, buckets=buckets
+        ).observe(value)
+
+    def set_max(self, name, labels, value):
+        """set a gauge reported as its maximum over every process"""
+        self._get(
+            prometheus_client.Gauge, name, labels, multiprocess_mode='max'
+        ).set(value)
+
+    def render(self):
+        """return every metric in the Prometheus text format, summed over
+        the worker processes in multiprocess mode"""
+        if os.environ.get(MULTIPROC_DIR_ENV):
+            registry = prometheus_client.CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = self._registry
+
+        return (
+            prometheus_client.generate_latest(registry) +
+            prometheus_client.generate_latest(_callbacks)
+        ).decode()
+
+
+registry = Registry()
+
+
+class CallbackCollector:
+    """report the values of the registered collector callables"""
+    families = {
+        'counter': CounterMetricFamily,
+        'gauge': GaugeMetricFamily,
+    }
+
+    def collect(self):
+        for collector in _collectors:
+            for name, kind, value in collector():
+                yield self.families[kind](name, name.replace('_', ' '),
+                                          value=value)
+
+
+_callbacks = prometheus_client.CollectorRegistry(auto_describe=False)
+_callbacks.register(CallbackCollector())
+
+
+def register_collector(collector):
+    """add a callable returning (name, type, value) triples to the
+    rendered metrics
+
+    Its values are read in the process answering the scrape, so they
+    should come from a store shared by the workers.
+    """
+    _collectors.append(collector)
+    return collector
+
+
+class Sample:
+    """the measurements of one instrumented request"""
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0
+        self.serializer_time = 0
+        self.serializing = False
+
+
+def current_sample():
+    """return the sample of the request being handled, if it is sampled"""
+    return getattr(_state, 'sample', None)
+
+
+def _record_query(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample = current_sample()
+        if sample is not None:
+            sample.queries += 1
+            sample.query_time += time.perf_counter() - start
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else 'unmatched'
+
+
+@contextmanager
+def serializing():
+    """add the time spent in the block to the request's sample as
+    serializer time
+
+    Blocks nested in another only count once, as part of the outermost.
+    """
+    sample = current_sample()
+    if sample is None or sample.serializing:
+        yield
+        return
+
+    sample.serializing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        sample.serializer_time += time.perf_counter() - start
+        sample.serializing = False
+
+
+class TimedSerializerMixin:
+    """Add the time spent representing objects to the request's sample
+
+    Nested serializers run inside their parent's timing, so only the
+    outermost call is measured. Queries made lazily while serializing are
+    included.
+    """
+
+    def to_representation(self, instance):
+        with serializing():
+            return super().to_representation(instance)
+
+
+class MetricsMiddleware:
+    """record the latency, status and size of every response by route
+    and instrument a sample of requests in depth"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        if random.random() < settings.METRICS_SAMPLE_RATE:
+            sample = _state.sample = Sample()
+            try:
+                with ExitStack() as stack:
+                    for connection in connections.all():
+                        stack.enter_context(
+                            connection.execute_wrapper(_record_query)
+                        )
+                    response = self.get_response(request)
+            finally:
+                _state.sample = None
+        else:
+            sample = None
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        labels = {'route': _route(request), 'method': request.method}
+        registry.observe(
+            'http_request_duration_seconds', labels, duration,
+            LATENCY_BUCKETS
+        )
+        registry.inc(
+            'http_responses_total',
+            dict(labels, status=response.status_code)
+        )
+        if not response.streaming:
+            registry.inc(
+                'http_response_bytes_total', labels, len(response.content)
+            )
+
+        if sample is not None:
+            self.record_sample(labels, sample)
+            if settings.METRICS_SERVER_TIMING:
+                response['Server-Timing'] = self.server_timing(
+                    sample, duration
+                )
+
+        return response
+
+    def record_sample(self, labels, sample):
+        registry.inc('http_requests_sampled_total', labels)
+        registry.observe(
+            'http_request_queries', labels, sample.queries, QUERY_BUCKETS
+        )
+        registry.inc('db_query_seconds_total', labels, sample.query_time)
+        registry.inc(
+            'serializer_seconds_total', labels, sample.serializer_time
+        )
+
+    def server_timing(self, sample, duration):
+        return ', '.join((
+            f'db;dur={sample.query_time * 1000:.2f};'
+            f'desc="{sample.queries} queries"',
+            f'serializer;dur={sample.serializer_time * 1000:.2f}',
+            f'total;dur={duration * 1000:.2f}',
+        ))
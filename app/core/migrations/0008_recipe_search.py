@@ -0,0 +1,62 @@
+# Generated by Django 2.1.15 on 2026-10-18 12:51
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+TRIGRAM_INDEXES = (
+    ('core_recipe_title_trgm', 'core_recipe', 'title'),
+    ('core_tag_name_trgm', 'core_tag', 'name'),
+    ('core_ingredient_name_trgm', 'core_ingredient', 'name'),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """enable pg_trgm where the server ships it and index the names"""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        if cursor.fetchone() is None:
+            return
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} '
+            f'ON {table} USING gin ({column} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+def fill_search_vectors(apps, schema_editor):
+    from core.search import update_search_vectors
+
+    Recipe = apps.get_model('core', 'Recipe')
+    update_search_vectors(Recipe.objects.all())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_collection_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_recipe_search_gin'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+        migrations.RunPython(fill_search_vectors, migrations.RunPython.noop),
+    ]
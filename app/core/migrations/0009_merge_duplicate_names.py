@@ -0,0 +1,39 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """fold tags and ingredients sharing a user and name into one row"""
+    Recipe = apps.get_model('core', 'Recipe')
+    for field in ('tags', 'ingredients'):
+        relation = Recipe._meta.get_field(field)
+        model = relation.related_model
+        through = relation.remote_field.through
+        target = relation.m2m_reverse_field_name()
+
+        duplicates = model.objects.values('user', 'name').annotate(
+            keep=Min('id'),
+            rows=Count('id')
+        ).filter(rows__gt=1)
+        for duplicate in duplicates:
+            others = model.objects.filter(
+                user=duplicate['user'],
+                name=duplicate['name']
+            ).exclude(id=duplicate['keep'])
+            for other in others:
+                linked = through.objects.filter(**{target: duplicate['keep']})
+                through.objects.filter(**{target: other}).exclude(
+                    recipe__in=linked.values('recipe')
+                ).update(**{target: duplicate['keep']})
+            others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.1.15 on 2026-10-18 14:48
+
+import django.contrib.postgres.fields
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def record_written_derivatives(apps, schema_editor):
+    """record the derivatives already written for existing images"""
+    from recipe.images import derivative_name
+
+    Recipe = apps.get_model('core', 'Recipe')
+    for recipe in Recipe.objects.exclude(image='').exclude(image=None) \
+            .only('id', 'image').iterator():
+        sizes = [
+            size for size in settings.RECIPE_IMAGE_DERIVATIVES
+            if default_storage.exists(derivative_name(recipe.image.name, size))
+        ]
+        if sizes:
+            Recipe.objects.filter(pk=recipe.pk).update(
+                image_derivatives=sizes
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_per_user_names'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_derivatives',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=32), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.RunPython(
+            record_written_derivatives, migrations.RunPython.noop
+        ),
+    ]
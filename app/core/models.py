@@ -2,10 +2,17 @@ import os
 import uuid
 
 from django.db import models
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models import F
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, \
                                 BaseUserManager, PermissionsMixin
 from django.conf import settings
 
+from core import hashing
+
 
 def recipe_image_file_path(instance, filename):
     """Generate file path for new recipe image"""
@@ -22,7 +29,7 @@ class UserManager(BaseUserManager):
         if not email:
             raise ValueError('Invalid email')
         user = self.model(email=self.normalize_email(email), **extra_fields)
-        user.set_password(password)
+        user.password = hashing.make_password(password)
         user.save(using=self._db)
 
         return user
@@ -56,6 +63,10 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    modified_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'name')
 
     def __str__(self):
         return self.name
@@ -68,6 +79,10 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    modified_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'name')
 
     def __str__(self):
         return self.name
@@ -86,6 +101,45 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image_derivatives = ArrayField(
+        models.CharField(max_length=32),
+        default=list,
+        blank=True,
+        editable=False
+    )
+    modified_at = models.DateTimeField(auto_now=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-id'],
+                name='core_recipe_user_id_idx'
+            ),
+            GinIndex(fields=['search_vector'], name='core_recipe_search_gin'),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class CollectionVersion(models.Model):
+    """Counter bumped whenever a user's recipes, tags or ingredients change"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True
+    )
+    version = models.PositiveIntegerField(default=0)
+    modified_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def bump(cls, user_id):
+        """advance the user's version, if anybody has read it yet"""
+        cls.objects.filter(user_id=user_id).update(
+            version=F('version') + 1,
+            modified_at=timezone.now()
+        )
+
+    def __str__(self):
+        return f'{self.user_id}:{self.version}'
@@ -0,0 +1,42 @@
+from django.conf import settings
+
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+from core.renderers import MessagePackRenderer, ORJSONRenderer, msgpack, \
+                           orjson
+
+
+UTF8 = ('utf-8', 'utf8')
+
+
+class ORJSONParser(parsers.JSONParser):
+    """JSON parser decoding with orjson when it is installed
+
+    orjson only reads UTF-8, so bodies in other charsets are parsed by
+    DRF's parser.
+    """
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower() not in UTF8:
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class MessagePackParser(parsers.BaseParser):
+    """Parser for bodies sent with Content-Type: application/msgpack"""
+    media_type = 'application/msgpack'
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
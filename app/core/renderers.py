@@ -0,0 +1,79 @@
+"""
+Faster encodings for API responses.
+
+orjson and msgpack are optional. Without orjson, ORJSONRenderer renders
+with the standard library exactly like DRF's JSONRenderer; the settings
+only offer MessagePackRenderer when msgpack is installed.
+
+Types neither library encodes natively, such as Decimal, lazy strings
+and datetimes, are converted by DRF's JSON encoder, so every renderer
+emits the same values.
+"""
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+_encoder = JSONEncoder()
+
+# DRF escapes these so the output stays a strict javascript subset.
+_LINE_SEPARATORS = (
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+)
+
+
+def encode_default(obj):
+    """return obj in a form the encoders handle, as DRF encodes it"""
+    return _encoder.default(obj)
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """JSON renderer encoding with orjson, byte for byte like DRF's
+
+    Indented output, which orjson cannot produce at every width DRF
+    allows, and ASCII or non compact settings use DRF's renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if orjson is None or indent is not None or self.ensure_ascii or \
+                not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if data is None:
+            return bytes()
+
+        ret = orjson.dumps(
+            data,
+            default=encode_default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        )
+        for separator, escaped in _LINE_SEPARATORS:
+            if separator in ret:
+                ret = ret.replace(separator, escaped)
+
+        return ret
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """Compact binary renderer, chosen with Accept: application/msgpack"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return bytes()
+
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
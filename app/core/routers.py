@@ -0,0 +1,211 @@
+"""
+Route the reads of safe API requests to read replicas.
+
+Views opt in with ``ReplicaReadMixin``. A safe request picks one replica
+once it is authenticated and every read it makes goes there; writes and
+the reads of any other code always use the primary. A user who just
+wrote is pinned to the primary for ``REPLICA_PIN_SECONDS`` so they read
+their own writes. Pins live in the REPLICA_PIN_CACHE_ALIAS cache, which
+must be shared by every worker; with a process local cache replicas are
+not used and the system check reports it.
+"""
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from rest_framework.permissions import SAFE_METHODS
+
+
+ROUND_ROBIN = 'round_robin'
+LEAST_LAG = 'least_lag'
+
+LAG_SQL = (
+    'SELECT COALESCE('
+    'EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)'
+)
+
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+_state = threading.local()
+_counter = itertools.count()
+_lags = {}
+_lags_lock = threading.Lock()
+
+
+def _cache():
+    return caches[settings.REPLICA_PIN_CACHE_ALIAS]
+
+
+def pin_cache_is_shared():
+    """return whether the pin cache is seen by every worker"""
+    backend = settings.CACHES[settings.REPLICA_PIN_CACHE_ALIAS]['BACKEND']
+    return backend not in LOCAL_CACHE_BACKENDS
+
+
+def check_pin_cache(app_configs=None, **kwargs):
+    """report replicas configured without a shared pin cache"""
+    if not settings.DATABASE_REPLICAS or pin_cache_is_shared():
+        return []
+
+    return [checks.Error(
+        'Read replicas need a cache shared by every worker to pin users '
+        'who just wrote to the primary.',
+        hint='Set CACHE_LOCATION, or point REPLICA_PIN_CACHE_ALIAS at a '
+             'shared cache.',
+        obj='REPLICA_PIN_CACHE_ALIAS',
+        id='core.E001',
+    )]
+
+
+def _pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """send the user's reads to the primary for the pin window"""
+    _cache().set(_pin_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    """return whether the user wrote within the pin window"""
+    return bool(_cache().get(_pin_key(user_id)))
+
+
+def replica_lag(alias):
+    """return the replication lag of a replica in seconds, None when it
+    cannot be reached
+
+    Results are reused for REPLICA_LAG_CHECK_INTERVAL seconds.
+    """
+    now = time.monotonic()
+    with _lags_lock:
+        checked_at, lag = _lags.get(alias, (None, None))
+    if checked_at is not None and \
+            now - checked_at < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return lag
+
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag = float(cursor.fetchone()[0])
+    except DatabaseError:
+        connections[alias].close()
+        lag = None
+
+    with _lags_lock:
+        _lags[alias] = (now, lag)
+    return lag
+
+
+def replicas_in_use():
+    """return whether reads may be sent to replicas at all"""
+    return bool(settings.DATABASE_REPLICAS) and pin_cache_is_shared()
+
+
+def choose_replica():
+    """return the alias of the replica to read from, or None to read from
+    the primary"""
+    if not replicas_in_use():
+        return None
+
+    replicas = settings.DATABASE_REPLICAS
+
+    if settings.REPLICA_SELECTION == LEAST_LAG:
+        lags = [(replica_lag(alias), alias) for alias in replicas]
+        fresh = [
+            (lag, alias) for lag, alias in lags
+            if lag is not None and lag <= settings.REPLICA_MAX_LAG
+        ]
+        return min(fresh)[1] if fresh else None
+
+    return replicas[next(_counter) % len(replicas)]
+
+
+@contextmanager
+def reading_from(alias):
+    """send the reads of the current thread to a database"""
+    previous = getattr(_state, 'alias', None)
+    _state.alias = alias
+    try:
+        yield
+    finally:
+        _state.alias = previous
+
+
+def reading_lazily(iterable):
+    """return an iterator over iterable reading from the database the
+    current request reads from, even after the request is finalized, as
+    the body of a streamed response is"""
+    alias = getattr(_state, 'alias', None)
+    iterator = iter(iterable)
+
+    def read():
+        while True:
+            with reading_from(alias):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    return read()
+
+
+class ReplicaRouter:
+    """send reads to the replica chosen for the current request"""
+
+    def db_for_read(self, model, **hints):
+        return getattr(_state, 'alias', None) or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Objects read from a replica would otherwise be saved there.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaReadMixin:
+    """Serve safe requests from a replica and pin writers to the primary
+
+    The replica is picked after authentication, so tokens are always
+    checked against the primary.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not replicas_in_use():
+            return
+
+        user_id = request.user.pk
+        if request.method not in SAFE_METHODS:
+            pin_to_primary(user_id)
+            return
+
+        alias = None if is_pinned(user_id) else choose_replica()
+        if alias is not None:
+            self._replica_reads = reading_from(alias)
+            self._replica_reads.__enter__()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        replica_reads = getattr(self, '_replica_reads', None)
+        if replica_reads is not None:
+            self._replica_reads = None
+            replica_reads.__exit__(None, None, None)
+
+        return super().finalize_response(request, response, *args, **kwargs)
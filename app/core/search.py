@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import connection
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+_trigram_available = None
+
+
+def trigram_available():
+    """return whether the pg_trgm extension is installed"""
+    global _trigram_available
+    if _trigram_available is None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+            )
+            _trigram_available = cursor.fetchone() is not None
+
+    return _trigram_available
+
+
+def _names(model):
+    """return a subquery of the names linked to the outer recipe"""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                recipe=OuterRef('pk')
+            ).values('recipe').annotate(
+                names=StringAgg('name', ' ')
+            ).values('names')
+        ),
+        Value('')
+    )
+
+
+def update_search_vectors(recipes):
+    """recompute the stored search vector of the recipes in one query
+
+    Titles weigh more than tag names, which weigh more than ingredient
+    names.
+    """
+    config = settings.RECIPE_SEARCH_CONFIG
+    tag = recipes.model._meta.get_field('tags').related_model
+    ingredient = recipes.model._meta.get_field('ingredients').related_model
+    recipes.update(
+        search_vector=(
+            SearchVector('title', weight='A', config=config) +
+            SearchVector(_names(tag), weight='B', config=config) +
+            SearchVector(_names(ingredient), weight='C', config=config)
+        )
+    )
@@ -0,0 +1,126 @@
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import m2m_changed, post_delete, \
+                                     post_save, pre_delete
+from django.dispatch import Signal, receiver
+
+from core.models import CollectionVersion, Ingredient, Recipe, Tag
+from core.search import update_search_vectors
+
+
+collection_changed = Signal(providing_args=['user_id'])
+
+_deferred = threading.local()
+
+
+@contextmanager
+def deferred_collection_changes():
+    """collapse the change handling done inside the block
+
+    Collection versions are bumped once per user and search vectors are
+    recomputed with one query when the block exits.
+    """
+    if getattr(_deferred, 'user_ids', None) is not None:
+        yield
+        return
+
+    _deferred.user_ids, _deferred.recipe_ids = set(), set()
+    try:
+        yield
+        user_ids, recipe_ids = _deferred.user_ids, _deferred.recipe_ids
+    finally:
+        _deferred.user_ids = _deferred.recipe_ids = None
+
+    refresh_recipe_search(recipe_ids)
+    for user_id in user_ids:
+        notify_collection_changed(user_id)
+
+
+def refresh_recipe_search(recipe_ids):
+    """recompute the search vectors of the recipes"""
+    pending = getattr(_deferred, 'recipe_ids', None)
+    if pending is not None:
+        pending.update(recipe_ids)
+    elif recipe_ids:
+        update_search_vectors(Recipe.objects.filter(pk__in=recipe_ids))
+
+
+def notify_collection_changed(user_id):
+    """bump the user's collection version and tell listeners about it"""
+    user_ids = getattr(_deferred, 'user_ids', None)
+    if user_ids is not None:
+        user_ids.add(user_id)
+        return
+
+    CollectionVersion.bump(user_id)
+    collection_changed.send(sender=CollectionVersion, user_id=user_id)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def bump_on_change(sender, instance, **kwargs):
+    """bump the owner's version when a recipe, tag or ingredient changes"""
+    notify_collection_changed(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def bump_on_link_change(sender, instance, action, **kwargs):
+    """bump the owner's version when recipe links change"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        notify_collection_changed(instance.user_id)
+
+
+@receiver(post_save, sender=Recipe)
+def refresh_search_on_recipe_save(sender, instance, update_fields=None,
+                                  **kwargs):
+    """keep the search vector current when the title may have changed"""
+    if update_fields is None or 'title' in update_fields:
+        refresh_recipe_search([instance.pk])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def refresh_search_on_rename(sender, instance, created, **kwargs):
+    """keep the search vectors of recipes using a renamed tag current"""
+    if not created:
+        refresh_recipe_search(
+            list(instance.recipe_set.values_list('pk', flat=True))
+        )
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def remember_linked_recipes(sender, instance, **kwargs):
+    """note the recipes whose search vectors a delete will change"""
+    instance._linked_recipe_ids = list(
+        instance.recipe_set.values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def refresh_search_on_delete(sender, instance, **kwargs):
+    """drop a deleted tag or ingredient from the search vectors"""
+    refresh_recipe_search(getattr(instance, '_linked_recipe_ids', []))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def refresh_search_on_link_change(sender, instance, action, reverse,
+                                  pk_set, **kwargs):
+    """keep the search vectors of relinked recipes current"""
+    if action == 'pre_clear' and reverse:
+        remember_linked_recipes(sender, instance)
+    elif action in ('post_add', 'post_remove'):
+        refresh_recipe_search(pk_set if reverse else [instance.pk])
+    elif action == 'post_clear':
+        refresh_recipe_search(
+            getattr(instance, '_linked_recipe_ids', [])
+            if reverse else [instance.pk]
+        )
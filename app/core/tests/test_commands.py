@@ -1,23 +1,73 @@
+from io import StringIO
 from unittest.mock import patch
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
 
 
+COMMAND = 'core.management.commands.wait_for_db.Command'
+
+
 class CommandTests(TestCase):
 
     def test_wait_for_db_ready(self):
         """testing wait for db when db is available"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+        out = StringIO()
+
+        call_command('wait_for_db', stdout=out)
+
+        self.assertIn('Database available', out.getvalue())
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         """Testing wait for db"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+        with patch(f'{COMMAND}.probe') as probe:
+            probe.side_effect = [OperationalError] * 5 + [None]
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEqual(probe.call_count, 6)
+            self.assertEqual(ts.call_count, 5)
+
+    @patch('random.uniform', side_effect=lambda low, high: high)
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_backoff(self, ts, uniform):
+        """test the wait between attempts doubles up to the maximum"""
+        with patch(f'{COMMAND}.probe') as probe:
+            probe.side_effect = [OperationalError] * 5 + [None]
+            call_command(
+                'wait_for_db', initial_delay=0.5, max_delay=3,
+                stdout=StringIO()
+            )
+
+        delays = [call[0][0] for call in ts.call_args_list]
+        self.assertEqual(delays, [0.5, 1, 2, 3, 3])
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        """test giving up once the total timeout has passed"""
+        with patch(f'{COMMAND}.probe', side_effect=OperationalError):
+            with self.assertRaises(CommandError):
+                call_command('wait_for_db', timeout=0, stdout=StringIO())
+
+        ts.assert_not_called()
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_migrations(self, ts):
+        """test optionally waiting until migrations are applied"""
+        with patch(f'{COMMAND}.unapplied_migrations') as unapplied:
+            unapplied.side_effect = [['core.0010_per_user_names'], []]
+            call_command(
+                'wait_for_db', check_migrations=True, stdout=StringIO()
+            )
+
+        self.assertEqual(unapplied.call_count, 2)
+        self.assertEqual(ts.call_count, 1)
+
+    def test_wait_for_db_migrations_applied(self):
+        """test the migration check passes on a migrated database"""
+        out = StringIO()
+
+        call_command('wait_for_db', check_migrations=True, stdout=out)
+
+        self.assertIn('Database available', out.getvalue())
@@ -0,0 +1,157 @@
+import threading
+from unittest.mock import Mock
+
+import psycopg2
+from psycopg2 import extensions
+
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.backends.postgresql import base
+from core.backends.postgresql.pool import ConnectionPool
+
+
+DB_STATS_URL = reverse('db-stats')
+
+
+def fake_connection(status=extensions.TRANSACTION_STATUS_IDLE):
+    """return a stand in for a psycopg2 connection"""
+    return Mock(closed=0, **{'get_transaction_status.return_value': status})
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """test the in process connection pool"""
+
+    def test_reuses_released_connection(self):
+        """test an idle connection is handed out instead of a new one"""
+        pool = ConnectionPool(size=1, timeout=1)
+        opened = fake_connection()
+        connect = Mock(return_value=opened)
+
+        conn, created_at, reused, _ = pool.acquire(connect)
+        pool.release(conn, created_at)
+        again, _, reused_again, _ = pool.acquire(connect)
+
+        self.assertIs(again, opened)
+        self.assertFalse(reused)
+        self.assertTrue(reused_again)
+        self.assertEqual(connect.call_count, 1)
+
+    def test_rolls_back_open_transaction(self):
+        """test a connection left in a transaction is rolled back"""
+        pool = ConnectionPool(size=1, timeout=1)
+        conn = fake_connection(extensions.TRANSACTION_STATUS_INTRANS)
+
+        pool.acquire(lambda: conn)
+        pool.release(conn, 0)
+
+        conn.rollback.assert_called_once_with()
+        self.assertEqual(pool.stats(), {'size': 1, 'idle': 1})
+
+    def test_discards_broken_connection(self):
+        """test a connection in an unknown state is closed, not pooled"""
+        pool = ConnectionPool(size=1, timeout=1)
+        conn = fake_connection(extensions.TRANSACTION_STATUS_UNKNOWN)
+
+        pool.acquire(lambda: conn)
+        pool.release(conn, 0)
+
+        conn.close.assert_called_once_with()
+        self.assertEqual(pool.stats(), {'size': 1, 'idle': 0})
+
+    def test_wait_counted_only_when_blocked(self):
+        """test an acquire reports a wait only if it had to block"""
+        pool = ConnectionPool(size=1, timeout=5)
+        conn, created_at, _, waited = pool.acquire(fake_connection)
+        self.assertIsNone(waited)
+
+        release = threading.Timer(0.05, pool.release, (conn, created_at))
+        release.start()
+        _, _, reused, waited = pool.acquire(fake_connection)
+        release.join()
+
+        self.assertTrue(reused)
+        self.assertGreater(waited, 0)
+
+    def test_times_out_when_exhausted(self):
+        """test waiting for a connection is bounded"""
+        pool = ConnectionPool(size=1, timeout=0.01)
+        pool.acquire(fake_connection)
+
+        with self.assertRaises(psycopg2.OperationalError):
+            pool.acquire(fake_connection)
+
+
+class DatabaseWrapperTests(TestCase):
+    """test the pooled and health checked database backend"""
+
+    def setUp(self):
+        base.stats.reset()
+        self.wrapper = base.DatabaseWrapper(
+            dict(connection.settings_dict, POOL_SIZE=1),
+            alias='pooled'
+        )
+        connections['pooled'] = self.wrapper
+
+    def tearDown(self):
+        self.wrapper.close()
+        del connections['pooled']
+        base.close_pools()
+
+    def test_pooled_connection_reused(self):
+        """test closing returns the connection to the pool for reuse"""
+        self.wrapper.ensure_connection()
+        pid = self.wrapper.connection.get_backend_pid()
+        self.wrapper.close()
+
+        self.wrapper.ensure_connection()
+
+        self.assertEqual(self.wrapper.connection.get_backend_pid(), pid)
+        counters = base.stats.snapshot()
+        self.assertEqual(counters['opened'], 1)
+        self.assertEqual(counters['reused'], 1)
+        self.assertEqual(counters['released'], 1)
+        self.assertEqual(counters['pool_waits'], 0)
+
+    def test_health_check_replaces_dead_connection(self):
+        """test a pooled connection dropped by the server is replaced"""
+        self.wrapper.ensure_connection()
+        pid = self.wrapper.connection.get_backend_pid()
+        self.wrapper.close()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            new_pid = cursor.fetchone()[0]
+
+        self.assertNotEqual(new_pid, pid)
+        self.assertEqual(base.stats.snapshot()['health_check_failures'], 1)
+
+
+class DatabaseStatsApiTests(TestCase):
+    """test exposing the connection counters"""
+
+    def test_stats_require_staff(self):
+        """test the connection counters are only exposed to staff"""
+        user = get_user_model().objects.create_user(
+            'aljon@yahoo.com',
+            'testing1234'
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        res = client.get(DB_STATS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        user.is_staff = True
+        user.save()
+        res = client.get(DB_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('pool_wait_seconds', res.data['connections'])
+        self.assertIn('pools', res.data)
@@ -0,0 +1,178 @@
+import importlib.util
+import threading
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import hashing
+
+
+TOKEN_URL = reverse('user:token')
+
+FAST_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+]
+
+
+class HashingTests(TestCase):
+    """test hashing passwords under the concurrency limit"""
+
+    def setUp(self):
+        self.reset_slots()
+        self.user = get_user_model().objects.create_user(
+            'aljon@yahoo.com',
+            'testing1234'
+        )
+
+    def tearDown(self):
+        self.reset_slots()
+
+    def reset_slots(self):
+        """make the next hash create slots sized by the current settings"""
+        hashing._admitted = None
+        hashing._running = None
+
+    def test_make_password_limited(self):
+        """test hashes made under the limit verify"""
+        self.user.password = hashing.make_password('secret123')
+
+        self.assertTrue(hashing.check_password(self.user, 'secret123'))
+        self.assertFalse(hashing.check_password(self.user, 'wrong'))
+
+    @override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+    def test_outdated_hash_upgraded(self):
+        """test a correct password stored by another hasher is rehashed"""
+        self.user.password = make_password('secret123', hasher='md5')
+        self.user.save()
+
+        self.assertTrue(hashing.check_password(self.user, 'secret123'))
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$'))
+
+    @override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+    def test_wrong_password_not_upgraded(self):
+        """test a wrong password leaves the stored hash alone"""
+        encoded = make_password('secret123', hasher='md5')
+        self.user.password = encoded
+        self.user.save()
+
+        self.assertFalse(hashing.check_password(self.user, 'wrong'))
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, encoded)
+
+    @override_settings(PASSWORD_HASH_CONCURRENCY=1, PASSWORD_HASH_QUEUE=0)
+    def test_busy_slots_reject(self):
+        """test hashing is refused at once when every slot is taken"""
+        self.reset_slots()
+        started, release = threading.Event(), threading.Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+
+        worker = threading.Thread(target=hashing.run, args=(block,))
+        worker.start()
+        started.wait(5)
+        try:
+            with self.assertRaises(hashing.HashingBusy):
+                hashing.run(make_password, 'secret123')
+        finally:
+            release.set()
+            worker.join()
+
+    @override_settings(PASSWORD_HASH_CONCURRENCY=1, PASSWORD_HASH_QUEUE=1)
+    def test_queued_hash_waits(self):
+        """test a hash admitted to the queue runs once the slot is free"""
+        self.reset_slots()
+        started, release = threading.Event(), threading.Event()
+        order = []
+
+        def block():
+            started.set()
+            release.wait(5)
+            order.append('first')
+
+        worker = threading.Thread(target=hashing.run, args=(block,))
+        worker.start()
+        started.wait(5)
+        release_later = threading.Timer(0.1, release.set)
+        release_later.start()
+        try:
+            hashing.run(order.append, 'second')
+        finally:
+            release.set()
+            worker.join()
+            release_later.join()
+
+        self.assertEqual(order, ['first', 'second'])
+
+    @skipUnless(importlib.util.find_spec('argon2'), 'argon2 not installed')
+    @override_settings(
+        PASSWORD_HASHERS=['core.hashing.Argon2PasswordHasher'],
+        PASSWORD_ARGON2_TIME_COST=3
+    )
+    def test_argon2_costs_from_settings(self):
+        """test argon2 hashes use the configured costs"""
+        encoded = hashing.make_password('secret123')
+
+        self.assertIn('t=3', encoded)
+        hasher = hashing.Argon2PasswordHasher()
+        with self.settings(PASSWORD_ARGON2_TIME_COST=2):
+            self.assertTrue(hasher.must_update(encoded))
+
+
+class TokenLoginHashingTests(TestCase):
+    """test logging in under the hashing limit"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'aljon@yahoo.com',
+            'testing1234'
+        )
+
+    @override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+    def test_login_upgrades_hash(self):
+        """test logging in rehashes a password from an older hasher"""
+        self.user.password = make_password('testing1234', hasher='md5')
+        self.user.save()
+
+        res = self.client.post(TOKEN_URL, {
+            'email': 'aljon@yahoo.com',
+            'password': 'testing1234',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$'))
+
+    def test_login_when_busy(self):
+        """test a login storm past the queue answers 503"""
+        with patch('core.hashing.run', side_effect=hashing.HashingBusy):
+            res = self.client.post(TOKEN_URL, {
+                'email': 'aljon@yahoo.com',
+                'password': 'testing1234',
+            })
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_unknown_user_still_hashes(self):
+        """test unknown emails cost a hash like known ones"""
+        with patch('core.hashing.make_password') as make:
+            res = self.client.post(TOKEN_URL, {
+                'email': 'nobody@yahoo.com',
+                'password': 'testing1234',
+            })
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        make.assert_called_once_with('testing1234')
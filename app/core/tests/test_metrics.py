@@ -0,0 +1,173 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from prometheus_client import values
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.backends.postgresql import base as db_backend
+from core.models import Recipe
+
+
+METRICS_URL = reverse('metrics')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class RegistryTests(SimpleTestCase):
+    """test the metric registry"""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """test each bucket counts the values at or below its bound"""
+        registry = metrics.Registry()
+        for value in (0.5, 1, 3, 10):
+            registry.observe('sizes', {}, value, (1, 5))
+
+        text = registry.render()
+        self.assertIn('sizes_bucket{le="1.0"} 2.0', text)
+        self.assertIn('sizes_bucket{le="5.0"} 3.0', text)
+        self.assertIn('sizes_bucket{le="+Inf"} 4.0', text)
+        self.assertIn('sizes_sum 14.5', text)
+
+    def test_render_escapes_labels(self):
+        """test label values are escaped in the text format"""
+        registry = metrics.Registry()
+        registry.inc('requests_total', {'route': 'a"b'}, 2)
+
+        self.assertIn('requests_total{route="a\\"b"} 2.0', registry.render())
+
+    def test_workers_summed(self):
+        """test a scrape of one worker reports the values of them all in
+        multiprocess mode"""
+        with tempfile.TemporaryDirectory() as path, \
+                patch.dict(os.environ, {metrics.MULTIPROC_DIR_ENV: path}):
+            for pid, age in ((101, 3), (102, 2)):
+                value_class = values.MultiProcessValue(lambda pid=pid: pid)
+                with patch.object(values, 'ValueClass', value_class):
+                    registry = metrics.Registry()
+                    registry.inc('requests_total', {'route': 'a'})
+                    registry.set_max('age_max_seconds', {}, age)
+
+            text = metrics.Registry().render()
+
+        self.assertIn('requests_total{route="a"} 2.0', text)
+        self.assertIn('age_max_seconds 3.0', text)
+
+
+class MetricsMiddlewareTests(TestCase):
+    """test recording request metrics"""
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.reset()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'aljon@yahoo.com',
+            'testing1234'
+        )
+        self.client.force_authenticate(self.user)
+        Recipe.objects.create(
+            user=self.user, title='Adobo', time_minutes=45, price=7.00
+        )
+
+    def render(self):
+        return metrics.registry.render()
+
+    @override_settings(METRICS_SAMPLE_RATE=1)
+    def test_sampled_request_instrumented(self):
+        """test a sampled request records queries and Server-Timing"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertRegex(
+            res['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="\d+ queries", '
+            r'serializer;dur=[\d.]+, total;dur=[\d.]+$'
+        )
+        text = self.render()
+        labels = '{method="GET",route="recipe:recipe-list"}'
+        self.assertIn(f'http_requests_sampled_total{labels} 1.0', text)
+        self.assertIn(f'http_request_queries_count{labels} 1.0', text)
+        self.assertIn(f'serializer_seconds_total{labels}', text)
+        self.assertIn(
+            'http_responses_total{method="GET",'
+            'route="recipe:recipe-list",status="200"} 1.0',
+            text
+        )
+
+    def serializer_seconds(self, route):
+        labels = f'{{method="GET",route="{route}"}}'
+        for line in self.render().splitlines():
+            if line.startswith(f'serializer_seconds_total{labels} '):
+                return float(line.split()[-1])
+
+    @override_settings(METRICS_SAMPLE_RATE=1, RECIPE_VALUES_READS=True)
+    def test_values_reads_timed(self):
+        """test representing recipe rows counts as serializer time"""
+        recipe = Recipe.objects.get()
+        self.client.get(RECIPES_URL)
+        self.client.get(reverse('recipe:recipe-detail', args=[recipe.id]))
+
+        self.assertGreater(self.serializer_seconds('recipe:recipe-list'), 0)
+        self.assertGreater(
+            self.serializer_seconds('recipe:recipe-detail'), 0
+        )
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_unsampled_request_only_timed(self):
+        """test requests outside the sample only record latency and size"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertNotIn('Server-Timing', res)
+        text = self.render()
+        labels = '{method="GET",route="recipe:recipe-list"}'
+        self.assertIn(
+            f'http_request_duration_seconds_count{labels} 1.0', text
+        )
+        self.assertIn(
+            f'http_response_bytes_total{labels} {len(res.content)}.0', text
+        )
+        self.assertNotIn('http_requests_sampled_total', text)
+
+    @override_settings(METRICS_SAMPLE_RATE=1)
+    def test_queries_counted(self):
+        """test the execute wrapper counts every query of the request"""
+        with CaptureQueriesContext(connection) as captured:
+            res = self.client.get(RECIPES_URL)
+
+        queries = res['Server-Timing'].split('desc="')[1].split()[0]
+        self.assertEqual(int(queries), len(captured))
+
+    def test_metrics_require_staff(self):
+        """test the metrics endpoint is only exposed to staff"""
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        text = res.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+        self.assertIn('recipe_response_cache_hit_total', text)
+
+    def test_connection_stats_recorded(self):
+        """test database connection events are recorded as metrics"""
+        self.addCleanup(db_backend.stats.reset)
+        db_backend.stats.connected(reused=False, waited=0.5)
+        db_backend.stats.disconnected(2)
+
+        text = self.render()
+        self.assertIn('db_connections_opened_total 1.0', text)
+        self.assertIn('db_connections_pool_wait_max_seconds 0.5', text)
+        self.assertIn('db_connections_connection_age_seconds_total 2.0', text)
@@ -0,0 +1,149 @@
+import datetime
+import importlib.util
+import io
+from collections import OrderedDict
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core import parsers, renderers
+from core.models import Recipe, Tag
+
+
+MSGPACK = importlib.util.find_spec('msgpack') is not None
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+PAYLOAD = OrderedDict([
+    ('id', 1),
+    ('title', 'Crème brûlée\u2028for two'),
+    ('price', Decimal('5.50')),
+    ('created', datetime.datetime(
+        2019, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc
+    )),
+    ('date', datetime.date(2019, 1, 2)),
+    ('detail', gettext_lazy('Not found.')),
+    ('tags', [{'id': 2, 'name': 'Dessert'}]),
+    ('counts', {1: 2}),
+    ('link', None),
+])
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """test orjson renders exactly what DRF's JSON renderer renders"""
+
+    def test_same_bytes_as_drf(self):
+        """test payloads with types orjson lacks render identically"""
+        self.assertEqual(
+            renderers.ORJSONRenderer().render(PAYLOAD),
+            JSONRenderer().render(PAYLOAD)
+        )
+
+    def test_indent_uses_drf(self):
+        """test indented output is left to DRF's renderer"""
+        media_type = 'application/json; indent=3'
+
+        self.assertEqual(
+            renderers.ORJSONRenderer().render(PAYLOAD, media_type),
+            JSONRenderer().render(PAYLOAD, media_type)
+        )
+
+    def test_without_orjson(self):
+        """test the renderer and parser work without orjson installed"""
+        with patch('core.renderers.orjson', None), \
+                patch('core.parsers.orjson', None):
+            content = renderers.ORJSONRenderer().render(PAYLOAD)
+            data = parsers.ORJSONParser().parse(io.BytesIO(content))
+
+        self.assertEqual(content, JSONRenderer().render(PAYLOAD))
+        self.assertEqual(data['price'], 5.5)
+
+    def test_parse_matches_drf(self):
+        """test bodies parse like they do with DRF's parser"""
+        content = JSONRenderer().render(PAYLOAD)
+
+        self.assertEqual(
+            parsers.ORJSONParser().parse(io.BytesIO(content)),
+            JSONParser().parse(io.BytesIO(content))
+        )
+
+    def test_parse_error(self):
+        """test malformed bodies are a parse error"""
+        with self.assertRaises(ParseError):
+            parsers.ORJSONParser().parse(io.BytesIO(b'{"title": '))
+
+
+@skipUnless(MSGPACK, 'msgpack not installed')
+class MessagePackTests(TestCase):
+    """test sending and accepting MessagePack"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'aljon@yahoo.com',
+            'testing1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_round_trip(self):
+        """test payloads decode to the values the JSON renderer emits"""
+        payload = OrderedDict(PAYLOAD)
+        del payload['counts']
+        content = renderers.MessagePackRenderer().render(payload)
+
+        self.assertEqual(
+            parsers.MessagePackParser().parse(io.BytesIO(content)),
+            JSONParser().parse(io.BytesIO(JSONRenderer().render(payload)))
+        )
+
+    def test_list_recipes(self):
+        """test recipes are listed as MessagePack when accepted"""
+        Recipe.objects.create(
+            user=self.user, title='Mango', time_minutes=5, price='2.50'
+        )
+
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        data = parsers.MessagePackParser().parse(io.BytesIO(res.content))
+        self.assertEqual(data['results'][0]['price'], '2.50')
+
+    def test_create_recipe(self):
+        """test recipes can be created from a MessagePack body"""
+        tag = Tag.objects.create(user=self.user, name='Dessert')
+        body = renderers.MessagePackRenderer().render({
+            'title': 'Mango',
+            'time_minutes': 5,
+            'price': '2.50',
+            'tags': [tag.id],
+            'ingredients': [],
+        })
+
+        res = self.client.post(
+            RECIPES_URL, body, content_type='application/msgpack'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(list(recipe.tags.all()), [tag])
+
+    def test_parse_error(self):
+        """test malformed MessagePack bodies are rejected"""
+        res = self.client.post(
+            RECIPES_URL, b'\xc1', content_type='application/msgpack'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
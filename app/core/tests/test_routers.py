@@ -0,0 +1,176 @@
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import routers
+from core.models import Recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+REPLICAS = ['replica_1', 'replica_2']
+
+# Stands in for memcached: any backend other than local memory is shared.
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.mkdtemp(prefix='replica-pins-'),
+    }
+}
+
+
+class ReplicaRouterTests(TestCase):
+    """test routing reads to replicas"""
+
+    def setUp(self):
+        cache.clear()
+        routers._lags.clear()
+        self.router = routers.ReplicaRouter()
+
+    def test_reads_use_primary_by_default(self):
+        """test reads outside a replica request go to the primary"""
+        self.assertEqual(self.router.db_for_read(Recipe), 'default')
+
+    def test_reads_use_chosen_replica(self):
+        """test reads go to the replica chosen for the request"""
+        with routers.reading_from('replica_2'):
+            self.assertEqual(self.router.db_for_read(Recipe), 'replica_2')
+            self.assertEqual(self.router.db_for_write(Recipe), 'default')
+
+        self.assertEqual(self.router.db_for_read(Recipe), 'default')
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS, CACHES=SHARED_CACHES)
+    def test_round_robin(self):
+        """test replicas take turns"""
+        chosen = {routers.choose_replica() for _ in range(4)}
+
+        self.assertEqual(chosen, set(REPLICAS))
+
+    @override_settings(
+        DATABASE_REPLICAS=REPLICAS + ['replica_3'],
+        CACHES=SHARED_CACHES,
+        REPLICA_SELECTION=routers.LEAST_LAG,
+        REPLICA_MAX_LAG=5
+    )
+    def test_least_lag(self):
+        """test the freshest reachable replica is chosen"""
+        lags = {'replica_1': 3.0, 'replica_2': None, 'replica_3': 1.5}
+        with patch('core.routers.replica_lag', side_effect=lags.get):
+            self.assertEqual(routers.choose_replica(), 'replica_3')
+
+        lags = {'replica_1': 30.0, 'replica_2': None, 'replica_3': 10.0}
+        with patch('core.routers.replica_lag', side_effect=lags.get):
+            self.assertIsNone(routers.choose_replica())
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS)
+    def test_local_pin_cache_refused(self):
+        """test replicas are not used when pins stay in one process"""
+        self.assertIsNone(routers.choose_replica())
+
+        errors = routers.check_pin_cache()
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+
+        with self.settings(CACHES=SHARED_CACHES):
+            self.assertEqual(routers.check_pin_cache(), [])
+            self.assertIn(routers.choose_replica(), REPLICAS)
+
+    def test_no_replicas_pass_check(self):
+        """test a local pin cache is fine without replicas"""
+        self.assertEqual(routers.check_pin_cache(), [])
+
+    @override_settings(REPLICA_LAG_CHECK_INTERVAL=60)
+    def test_replica_lag_measured_and_reused(self):
+        """test a server that replays nothing reports no lag, once per
+        interval"""
+        self.assertEqual(routers.replica_lag('default'), 0)
+
+        with self.assertNumQueries(0):
+            routers.replica_lag('default')
+
+    def test_allow_migrate_skips_replicas(self):
+        """test migrations only run on the primary"""
+        with override_settings(DATABASE_REPLICAS=REPLICAS):
+            self.assertTrue(self.router.allow_migrate('default', 'core'))
+            self.assertFalse(self.router.allow_migrate('replica_1', 'core'))
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, CACHES=SHARED_CACHES)
+@patch('core.routers.choose_replica', return_value='default')
+class ReplicaReadMixinTests(TestCase):
+    """test safe requests read from replicas unless the user just wrote"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'aljon@yahoo.com',
+            'testing1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_reads_from_replica(self, choose):
+        """test listing recipes picks a replica"""
+        with patch('core.routers.reading_from',
+                   wraps=routers.reading_from) as reading:
+            self.client.get(RECIPES_URL)
+
+        choose.assert_called_once_with()
+        reading.assert_called_once_with('default')
+        self.assertIsNone(getattr(routers._state, 'alias', None))
+
+    def test_write_pins_user_to_primary(self, choose):
+        """test reads after a write stay on the primary"""
+        self.client.post(RECIPES_URL, {
+            'title': 'Sinigang',
+            'time_minutes': 30,
+            'price': 5.00
+        })
+
+        self.assertTrue(routers.is_pinned(self.user.pk))
+        self.client.get(RECIPES_URL)
+        choose.assert_not_called()
+
+    def test_export_streams_from_replica(self, choose):
+        """test a streamed export reads from the request's replica while
+        its body is consumed"""
+        Recipe.objects.create(
+            user=self.user, title='Sinigang', time_minutes=30, price=5.00
+        )
+        aliases = []
+
+        def related(field, recipe_ids):
+            aliases.append(getattr(routers._state, 'alias', None))
+            return {}
+
+        with patch('recipe.export._related', side_effect=related):
+            res = self.client.get(reverse('recipe:recipe-export'))
+            self.assertIsNone(getattr(routers._state, 'alias', None))
+            b''.join(res.streaming_content)
+
+        self.assertEqual(aliases, ['default', 'default'])
+        self.assertIsNone(getattr(routers._state, 'alias', None))
+
+    def test_manage_user_reads_from_replica(self, choose):
+        """test the profile endpoint picks a replica"""
+        self.client.get(reverse('user:me'))
+
+        choose.assert_called_once_with()
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_skip_pins(self, choose):
+        """test requests neither pin nor check pins without replicas"""
+        with patch('core.routers._cache') as pin_cache:
+            self.client.post(RECIPES_URL, {
+                'title': 'Sinigang',
+                'time_minutes': 30,
+                'price': 5.00
+            })
+            self.client.get(RECIPES_URL)
+
+        pin_cache.assert_not_called()
+        choose.assert_not_called()
@@ -0,0 +1,80 @@
+import json
+import os
+from contextlib import ExitStack
+
+from django.core.cache import caches
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+UPDATE_BASELINE = os.environ.get('UPDATE_QUERY_BASELINE') == '1'
+
+
+class QueryCountMixin:
+    """Assert the query counts of API actions stay flat and recorded
+
+    ``query_baseline`` names a JSON file mapping action names to their
+    query counts. A test fails when an action needs more queries than
+    recorded; run with UPDATE_QUERY_BASELINE=1 to record new counts.
+    """
+    query_baseline = None
+    query_sizes = (1, 10)
+
+    def count_queries(self, request, prepare=None):
+        """return the number of queries of request(*prepare())
+
+        Caches are cleared first, so cached responses do not hide the
+        queries of the action.
+        """
+        args = prepare() if prepare is not None else ()
+        for cache in caches.all():
+            cache.clear()
+
+        with ExitStack() as stack:
+            captured = [
+                stack.enter_context(CaptureQueriesContext(connection))
+                for connection in connections.all()
+            ]
+            res = request(*args)
+
+        self.assertLess(res.status_code, 400, getattr(res, 'data', res))
+        return sum(len(context) for context in captured)
+
+    def assertConstantQueries(self, name, request, grow, prepare=None):
+        """assert the action's query count does not grow with the data
+
+        ``grow(size)`` adds that many rows of whatever the action reads
+        before each measurement. An unmeasured first call keeps one off
+        work, such as creating the collection version, out of the counts.
+        """
+        request(*(prepare() if prepare is not None else ()))
+
+        counts = []
+        for size in self.query_sizes:
+            grow(size)
+            counts.append(self.count_queries(request, prepare))
+
+        self.assertEqual(
+            len(set(counts)), 1,
+            f'{name} queries grow with the data: '
+            f'{dict(zip(self.query_sizes, counts))}'
+        )
+        self.assertWithinBaseline(name, counts[-1])
+
+    def assertWithinBaseline(self, name, count):
+        """assert the action needs no more queries than recorded"""
+        with open(self.query_baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+
+        if UPDATE_BASELINE:
+            baseline[name] = count
+            with open(self.query_baseline, 'w') as baseline_file:
+                json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+                baseline_file.write('\n')
+            return
+
+        self.assertIn(name, baseline, f'no recorded query count for {name}')
+        self.assertLessEqual(
+            count, baseline[name],
+            f'{name} needs {count} queries, {baseline[name]} recorded'
+        )
@@ -0,0 +1,35 @@
+from django.http import HttpResponse
+
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import metrics
+from core.backends.postgresql import base as db_backend
+from user.authentication import CachedTokenAuthentication
+
+
+class MetricsView(APIView):
+    """expose the request metrics of every worker to Prometheus"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request, format=None):
+        """return the metrics in the Prometheus text format"""
+        return HttpResponse(
+            metrics.registry.render(),
+            content_type=metrics.CONTENT_TYPE
+        )
+
+
+class DatabaseStatsView(APIView):
+    """report the database connection counters of this process"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request, format=None):
+        """return the connection and pool counters"""
+        return Response({
+            'connections': db_backend.stats.snapshot(),
+            'pools': db_backend.pool_stats(),
+        })
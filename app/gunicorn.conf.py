@@ -0,0 +1,60 @@
+"""
+Gunicorn configuration for serving the API in production.
+
+Run with: gunicorn -c gunicorn.conf.py app.wsgi
+
+Every setting can be overridden from the environment. Send SIGHUP to the
+master process to reload the workers gracefully.
+"""
+
+import glob
+import multiprocessing
+import os
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Preforked workers sized to the cores; with more than one thread per
+# worker the threaded worker is used so slow I/O does not block a process.
+workers = int(
+    os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1)
+)
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Recycle workers after a jittered number of requests to bound memory creep
+# without restarting every worker at once.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Loading the app before forking shares its memory between workers, but
+# a graceful reload then no longer picks up code changes.
+preload_app = bool(int(os.environ.get('GUNICORN_PRELOAD', 0)))
+
+# Heartbeat files on tmpfs avoid worker stalls on slow container disks.
+worker_tmp_dir = os.environ.get('GUNICORN_WORKER_TMP_DIR', '/dev/shm')
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+# Request metrics are written by every worker to files in this directory
+# and summed when any worker is scraped. It must be set before the app is
+# loaded, and is emptied when the master starts.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/dev/shm/prometheus')
+
+
+def on_starting(server):
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    os.makedirs(path, exist_ok=True)
+    for name in glob.glob(os.path.join(path, '*.db')):
+        os.remove(name)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
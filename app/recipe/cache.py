@@ -0,0 +1,108 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.dispatch import receiver
+
+from core import metrics
+from core.signals import collection_changed
+
+
+STATS = ('hit', 'miss', 'evict')
+ID_LIST_PARAMS = ('tags', 'ingredients')
+NAME_LIST_PARAMS = ('fields', 'expand')
+FLAG_PARAMS = ('assigned_only',)
+
+
+def _cache():
+    return caches[settings.RECIPE_RESPONSE_CACHE_ALIAS]
+
+
+def _stat_key(name):
+    return f'recipe-response:stats:{name}'
+
+
+def _incr(name, delta=1):
+    """add to a counter in one round trip once it exists"""
+    cache = _cache()
+    key = _stat_key(name)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, None):
+            cache.incr(key, delta)
+
+
+def _normalise_flag(value):
+    try:
+        return str(int(bool(int(value))))
+    except ValueError:
+        return value
+
+
+def normalise_params(query_params):
+    """return the query parameters in a canonical, hashable form
+
+    Only the last value of a repeated parameter is kept, as that is the
+    one the views read.
+    """
+    params = []
+    for name in sorted(query_params):
+        value = query_params[name]
+        if name in ID_LIST_PARAMS + NAME_LIST_PARAMS:
+            value = ','.join(sorted(set(value.split(','))))
+        elif name in FLAG_PARAMS:
+            value = _normalise_flag(value)
+        params.append((name, value))
+
+    return tuple(params)
+
+
+def make_key(request, version, action, pk=None):
+    """return the cache key of a response for the user's version"""
+    parts = (
+        request.build_absolute_uri('/'),
+        action,
+        str(pk),
+        repr(normalise_params(request.query_params)),
+    )
+    digest = hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+    return f'recipe-response:{version.user_id}:{version.version}:{digest}'
+
+
+def fetch(key):
+    """return the cached response data or None, counting hits/misses"""
+    data = _cache().get(key)
+    _incr('hit' if data is not None else 'miss')
+
+    return data
+
+
+def store(key, data):
+    """cache response data until the timeout
+
+    Nothing is deleted when the collection changes: the key carries the
+    version, so entries of older versions are never read again and expire.
+    """
+    _cache().set(key, data, settings.RECIPE_RESPONSE_CACHE_TIMEOUT)
+
+
+def stats():
+    """return the hit, miss and evict counters"""
+    values = _cache().get_many([_stat_key(name) for name in STATS])
+
+    return {name: values.get(_stat_key(name), 0) for name in STATS}
+
+
+@receiver(collection_changed)
+def count_eviction(sender, user_id, **kwargs):
+    """count the user's cached responses being retired by a change"""
+    _incr('evict')
+
+
+@metrics.register_collector
+def cache_metrics():
+    """yield the response cache counters for the metrics endpoint"""
+    for name, value in stats().items():
+        yield f'recipe_response_cache_{name}_total', 'counter', value
@@ -0,0 +1,120 @@
+import csv
+import io
+import itertools
+import json
+
+from rest_framework import renderers
+
+from core.models import Recipe
+
+
+FIELDS = ('id', 'title', 'time_minutes', 'price', 'link')
+RELATIONS = ('tags', 'ingredients')
+CSV_HEADER = FIELDS + ('tag_ids', 'tags', 'ingredient_ids', 'ingredients')
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class ExportRenderer(renderers.BaseRenderer):
+    """Let an export format be chosen with the Accept header
+
+    The view streams the export itself, so this only renders error
+    details, as JSON.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return renderers.JSONRenderer().render(data)
+
+
+class NDJSONRenderer(ExportRenderer):
+    media_type = CONTENT_TYPES['ndjson']
+    format = 'ndjson'
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = CONTENT_TYPES['csv']
+    format = 'csv'
+
+
+RENDERER_CLASSES = [NDJSONRenderer, CSVRenderer]
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _related(field, recipe_ids):
+    """return the linked objects of the recipes keyed by recipe id"""
+    relation = Recipe._meta.get_field(field)
+    through = relation.remote_field.through
+    source = relation.m2m_field_name()
+    target = relation.m2m_reverse_field_name()
+
+    related = {}
+    rows = through.objects.filter(
+        **{f'{source}_id__in': recipe_ids}
+    ).order_by(f'{target}_id').values_list(
+        f'{source}_id', f'{target}_id', f'{target}__name'
+    )
+    for recipe_id, pk, name in rows:
+        related.setdefault(recipe_id, []).append({'id': pk, 'name': name})
+
+    return related
+
+
+def iter_recipes(queryset, chunk_size):
+    """yield recipes as dicts, fetching their links chunk by chunk
+
+    Rows are read through a server side cursor and the tags and
+    ingredients of each chunk are fetched with one query per relation,
+    so memory use is bounded by the chunk size.
+    """
+    rows = queryset.values(*FIELDS).iterator(chunk_size=chunk_size)
+    for chunk in _chunks(rows, chunk_size):
+        ids = [row['id'] for row in chunk]
+        related = {field: _related(field, ids) for field in RELATIONS}
+        for row in chunk:
+            row['price'] = str(row['price'])
+            for field in RELATIONS:
+                row[field] = related[field].get(row['id'], [])
+            yield row
+
+
+def _ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row) + '\n'
+
+
+def _csv_lines(rows):
+    """yield a header and a line per recipe; the ids and names of linked
+    objects are JSON arrays within their cells, as names may hold any
+    separator"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    for row in rows:
+        values = [row[field] for field in FIELDS]
+        for field in RELATIONS:
+            values.append(json.dumps([obj['id'] for obj in row[field]]))
+            values.append(json.dumps([obj['name'] for obj in row[field]]))
+        writer.writerow(values)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def stream(queryset, output, chunk_size):
+    """yield the recipes encoded as ndjson or csv, a chunk at a time"""
+    lines = _ndjson_lines if output == 'ndjson' else _csv_lines
+    for chunk in _chunks(lines(iter_recipes(queryset, chunk_size)),
+                         chunk_size):
+        yield ''.join(chunk)
@@ -0,0 +1,111 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, \
+                                           TrigramSimilarity
+from django.db.models import Count, DecimalField, Exists, F, OuterRef, Q, \
+                             Subquery
+from django.db.models.functions import Cast, Coalesce
+
+from core.models import Ingredient, Recipe, Tag
+from core.search import trigram_available
+
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_CHOICES = (MATCH_ANY, MATCH_ALL)
+
+
+def filter_by_related(queryset, field, ids, match=MATCH_ANY):
+    """Filter recipes linked to any or all of the given related ids
+
+    The lookups run as subqueries against the through table so a recipe
+    matching several ids is never repeated in the results.
+    """
+    relation = Recipe._meta.get_field(field)
+    through = relation.remote_field.through
+    source = relation.m2m_field_name()
+    target = relation.m2m_reverse_field_name()
+    ids = set(ids)
+
+    if match == MATCH_ALL:
+        matching = through.objects.filter(
+            **{f'{target}__in': ids}
+        ).values(source).annotate(
+            matched=Count(target)
+        ).filter(matched=len(ids)).values(source)
+        return queryset.filter(pk__in=matching)
+
+    links = through.objects.filter(
+        **{source: OuterRef('pk'), f'{target}__in': ids}
+    )
+    annotation = f'has_{field}'
+    return queryset.annotate(
+        **{annotation: Exists(links)}
+    ).filter(**{annotation: True})
+
+
+def _links_to(queryset):
+    """return the recipe links of the queryset's tags or ingredients"""
+    relation = next(
+        field for field in Recipe._meta.many_to_many
+        if field.related_model is queryset.model
+    )
+    through = relation.remote_field.through
+    target = relation.m2m_reverse_field_name()
+
+    return through.objects.filter(**{target: OuterRef('pk')}), target
+
+
+def assigned_only(queryset):
+    """Filter tags or ingredients used by at least one recipe
+
+    A semi-join stops at the first link, so the cost follows the number
+    of tags rather than the number of links and needs no DISTINCT.
+    """
+    links, _ = _links_to(queryset)
+
+    return queryset.annotate(assigned=Exists(links)).filter(assigned=True)
+
+
+def with_recipe_counts(queryset):
+    """annotate tags or ingredients with the number of recipes using them"""
+    links, target = _links_to(queryset)
+    counts = links.order_by().values(target).annotate(
+        recipes=Count('*')
+    ).values('recipes')
+
+    return queryset.annotate(recipe_count=Coalesce(Subquery(counts), 0))
+
+
+def search(queryset, term):
+    """Filter recipes matching the search term, annotated with a rank
+
+    Matches come from the stored full text search vector and, when the
+    pg_trgm extension is installed, from trigram similarity to the title
+    or to a tag or ingredient name so typos still match. The rank is a
+    fixed precision decimal so it can key cursor pagination.
+    """
+    query = SearchQuery(term, config=settings.RECIPE_SEARCH_CONFIG)
+    rank = SearchRank(F('search_vector'), query)
+    matches = Q(search_vector=query)
+
+    if trigram_available():
+        similar_names = {}
+        for model in (Tag, Ingredient):
+            similar_names[f'similar_{model._meta.model_name}'] = Exists(
+                model.objects.filter(
+                    recipe=OuterRef('pk'),
+                    name__trigram_similar=term
+                )
+            )
+        queryset = queryset.annotate(**similar_names)
+        matches |= Q(title__trigram_similar=term)
+        for annotation in similar_names:
+            matches |= Q(**{annotation: True})
+        rank = rank + TrigramSimilarity('title', term)
+
+    return queryset.filter(matches).annotate(
+        search_rank=Cast(
+            rank,
+            DecimalField(max_digits=12, decimal_places=6)
+        )
+    )
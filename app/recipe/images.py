@@ -0,0 +1,134 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, features
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+
+from core.models import Recipe
+from core.signals import notify_collection_changed
+
+
+logger = logging.getLogger(__name__)
+
+SAVE_OPTIONS = {
+    'WEBP': {'quality': 80, 'method': 4},
+    'JPEG': {'quality': 80, 'optimize': True, 'progressive': True},
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def derivative_format():
+    """return the Pillow format derivatives are encoded with"""
+    return 'WEBP' if features.check('webp') else 'JPEG'
+
+
+def derivative_name(name, size):
+    """return the storage name of a derivative of the original image"""
+    root, _ = os.path.splitext(name)
+    ext = derivative_format().lower()
+
+    return f'{root}_{size}.{ext}'
+
+
+def derivative_urls(name, sizes):
+    """return the urls of the derivatives of the original image in sizes,
+    the ones written so far, None when there is no image
+
+    While the derivatives are generated the recipe records none of them;
+    the collection version is bumped once they are recorded.
+    """
+    if not name:
+        return None
+
+    return {
+        size: default_storage.url(derivative_name(name, size))
+        for size in settings.RECIPE_IMAGE_DERIVATIVES if size in sizes
+    }
+
+
+def generate_derivatives(name):
+    """write a size bounded copy of the image for every derivative and
+    return the sizes written"""
+    fmt = derivative_format()
+    sizes = sorted(
+        settings.RECIPE_IMAGE_DERIVATIVES.items(),
+        key=lambda item: item[1],
+        reverse=True
+    )
+    written = []
+    with default_storage.open(name) as original:
+        img = Image.open(original)
+        img.draft('RGB', (sizes[0][1], sizes[0][1]))
+        keep_alpha = fmt == 'WEBP' and img.mode in ('RGBA', 'LA', 'P')
+        img = img.convert('RGBA' if keep_alpha else 'RGB')
+
+        # Largest first, so every size is scaled down from the previous one
+        for size, bound in sizes:
+            img.thumbnail((bound, bound), Image.LANCZOS)
+            buffer = io.BytesIO()
+            img.save(buffer, format=fmt, **SAVE_OPTIONS[fmt])
+            path = derivative_name(name, size)
+            default_storage.delete(path)
+            default_storage.save(path, ContentFile(buffer.getvalue()))
+            written.append(size)
+
+    return written
+
+
+def delete_derivatives(name):
+    """remove every derivative of the original image"""
+    for size in settings.RECIPE_IMAGE_DERIVATIVES:
+        default_storage.delete(derivative_name(name, size))
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RECIPE_IMAGE_WORKERS,
+                thread_name_prefix='recipe-image'
+            )
+
+    return _executor
+
+
+def _generate(recipe_id, name, user_id):
+    sizes = generate_derivatives(name)
+    # Unless the image was replaced meanwhile; its own upload records it.
+    Recipe.objects.filter(pk=recipe_id, image=name).update(
+        image_derivatives=sizes
+    )
+    # Responses cached without the derivatives must not be served again.
+    notify_collection_changed(user_id)
+
+
+def _generate_logged(recipe_id, name, user_id):
+    try:
+        _generate(recipe_id, name, user_id)
+    except Exception:
+        logger.exception('Failed to generate derivatives for %s', name)
+        raise
+    finally:
+        connection.close()
+
+
+def schedule_derivatives(recipe_id, name, user_id):
+    """generate the derivatives of the image of the user's recipe in the
+    background worker pool and record them on the recipe"""
+    if not settings.RECIPE_IMAGE_ASYNC:
+        _generate(recipe_id, name, user_id)
+        return None
+
+    return _get_executor().submit(
+        _generate_logged, recipe_id, name, user_id
+    )
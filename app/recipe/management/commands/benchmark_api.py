@@ -0,0 +1,270 @@
+import http.client
+import io
+import itertools
+import json
+import math
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from PIL import Image
+
+from recipe.management.commands.seed_data import EMAIL
+
+
+SCENARIOS = ('login', 'list', 'filtered', 'detail', 'create', 'upload')
+QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def percentile(values, percent):
+    """return the nearest rank percentile of the values"""
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def _jpeg():
+    buffer = io.BytesIO()
+    Image.new('RGB', (800, 600), (200, 120, 40)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+class Client:
+    """a keep-alive HTTP connection per thread to the API under test"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.token = None
+        self._local = threading.local()
+
+    def _connection(self):
+        if not hasattr(self._local, 'connection'):
+            factory = http.client.HTTPSConnection \
+                if self.scheme == 'https' else http.client.HTTPConnection
+            self._local.connection = factory(self.netloc, timeout=30)
+        return self._local.connection
+
+    def request(self, method, path, body=None, content_type=None):
+        """return the status, headers and body of one request"""
+        headers = {}
+        if self.token:
+            headers['Authorization'] = f'Token {self.token}'
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode()
+            content_type = 'application/json'
+        if content_type:
+            headers['Content-Type'] = content_type
+
+        connection = self._connection()
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            return response.status, response.headers, response.read()
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            del self._local.connection
+            raise
+
+    def json(self, method, path, body=None):
+        status, _, content = self.request(method, path, body)
+        if status >= 400:
+            raise CommandError(f'{method} {path} answered {status}')
+        return json.loads(content)
+
+
+class Command(BaseCommand):
+    """Django command running load scenarios against a running API
+
+    Run seed_data first and start the server with METRICS_SAMPLE_RATE=1
+    to get queries per request from its Server-Timing header. The create
+    and upload scenarios write to the benchmark user's data.
+
+    Read scenarios add a parameter of their own to every request, so the
+    response cache and conditional GETs never answer them and each one
+    runs the full read; pass --cached to measure repeated requests.
+    """
+    help = 'Benchmark API scenarios against a running server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000')
+        parser.add_argument('--email', default=EMAIL.format(0))
+        parser.add_argument('--password', default='benchmark')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS
+        )
+        parser.add_argument(
+            '--cached', action='store_true',
+            help='Repeat the same read requests, letting the response '
+                 'cache answer them.',
+        )
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Print the results as JSON for comparing runs.',
+        )
+
+    def handle(self, *args, **options):
+        self.cached = options['cached']
+        self.run_id = uuid.uuid4().hex[:8]
+        self.serial = itertools.count()
+        client = Client(options['url'])
+        credentials = {
+            'email': options['email'],
+            'password': options['password'],
+        }
+        client.token = client.json(
+            'POST', '/api/user/token/', credentials
+        )['token']
+        fixtures = self._fixtures(client)
+
+        results = {}
+        for name in options['scenarios']:
+            scenario = getattr(self, f'scenario_{name}')(
+                client, fixtures, credentials
+            )
+            results[name] = self._run(scenario, options)
+            if not options['json']:
+                self._report(name, results[name])
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+
+    def _fixtures(self, client):
+        """return the ids the scenarios request"""
+        def ids(path):
+            page = client.json('GET', f'{path}?page_size=20')
+            return [item['id'] for item in page['results']]
+
+        fixtures = {
+            'recipes': ids('/api/recipe/recipes/'),
+            'tags': ids('/api/recipe/tags/'),
+            'ingredients': ids('/api/recipe/ingredients/'),
+        }
+        if not fixtures['recipes']:
+            raise CommandError('The benchmark user has no recipes')
+
+        return fixtures
+
+    def scenario_login(self, client, fixtures, credentials):
+        login = Client(f'{client.scheme}://{client.netloc}')
+        return lambda index: login.request(
+            'POST', '/api/user/token/', credentials
+        )
+
+    def read_path(self, path, params=None):
+        """return the path of a read with its query, unique to the request
+        unless --cached was given"""
+        params = dict(params or {})
+        if not self.cached:
+            params['benchmark'] = f'{self.run_id}-{next(self.serial)}'
+
+        return f'{path}?{urlencode(params)}' if params else path
+
+    def scenario_list(self, client, fixtures, credentials):
+        return lambda index: client.request(
+            'GET', self.read_path('/api/recipe/recipes/')
+        )
+
+    def scenario_filtered(self, client, fixtures, credentials):
+        params = {
+            'tags': ','.join(map(str, fixtures['tags'][:2])),
+            'ingredients': ','.join(map(str, fixtures['ingredients'][:2])),
+        }
+        return lambda index: client.request(
+            'GET', self.read_path('/api/recipe/recipes/', params)
+        )
+
+    def scenario_detail(self, client, fixtures, credentials):
+        recipes = fixtures['recipes']
+        return lambda index: client.request('GET', self.read_path(
+            f'/api/recipe/recipes/{recipes[index % len(recipes)]}/'
+        ))
+
+    def scenario_create(self, client, fixtures, credentials):
+        return lambda index: client.request('POST', '/api/recipe/recipes/', {
+            'title': f'Benchmark recipe {index}',
+            'time_minutes': 30,
+            'price': '9.99',
+            'tags': fixtures['tags'][:2],
+            'ingredients': fixtures['ingredients'][:5],
+        })
+
+    def scenario_upload(self, client, fixtures, credentials):
+        boundary = uuid.uuid4().hex
+        body = b'\r\n'.join((
+            f'--{boundary}'.encode(),
+            b'Content-Disposition: form-data; name="image"; '
+            b'filename="benchmark.jpg"',
+            b'Content-Type: image/jpeg',
+            b'',
+            _jpeg(),
+            f'--{boundary}--'.encode(),
+            b'',
+        ))
+        recipes = fixtures['recipes']
+        return lambda index: client.request(
+            'POST',
+            f'/api/recipe/recipes/{recipes[index % len(recipes)]}'
+            f'/upload-image/',
+            body,
+            f'multipart/form-data; boundary={boundary}'
+        )
+
+    def _run(self, scenario, options):
+        """run the scenario and return its latency and query figures"""
+        for index in range(options['warmup']):
+            scenario(index)
+
+        def timed(index):
+            start = time.perf_counter()
+            try:
+                status, headers, _ = scenario(index)
+            except (http.client.HTTPException, OSError):
+                return time.perf_counter() - start, None, None
+            match = QUERIES.search(headers.get('Server-Timing', ''))
+            return (
+                time.perf_counter() - start,
+                status,
+                int(match.group(1)) if match else None
+            )
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            samples = list(executor.map(timed, range(options['requests'])))
+        elapsed = time.perf_counter() - start
+
+        latencies = [latency * 1000 for latency, _, _ in samples]
+        queries = [count for _, _, count in samples if count is not None]
+        return {
+            'requests': len(samples),
+            'errors': sum(
+                1 for _, status, _ in samples
+                if status is None or status >= 400
+            ),
+            'throughput': len(samples) / elapsed,
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+            'queries_per_request':
+                sum(queries) / len(queries) if queries else None,
+        }
+
+    def _report(self, name, result):
+        queries = result['queries_per_request']
+        self.stdout.write(
+            f'{name:>9}: {result["throughput"]:8.1f} req/s  '
+            f'p50 {result["p50_ms"]:7.1f} ms  '
+            f'p95 {result["p95_ms"]:7.1f} ms  '
+            f'p99 {result["p99_ms"]:7.1f} ms  '
+            f'queries {"-" if queries is None else f"{queries:.1f}"}  '
+            f'errors {result["errors"]}'
+        )
@@ -0,0 +1,81 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Recipe, Tag
+
+from recipe import filters
+
+
+class Command(BaseCommand):
+    """Django command comparing the assigned_only implementations
+
+    Sample data is created inside a transaction that is rolled back, so
+    the command leaves the database untouched.
+    """
+    help = 'Benchmark assigned_only and with_counts tag queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--links', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self._seed(options)
+            queries = {
+                'join + distinct': lambda: Tag.objects.filter(
+                    user=user, recipe__isnull=False
+                ).order_by('-name').distinct(),
+                'exists': lambda: filters.assigned_only(
+                    Tag.objects.filter(user=user)
+                ).order_by('-name'),
+                'exists + counts': lambda: filters.with_recipe_counts(
+                    filters.assigned_only(Tag.objects.filter(user=user))
+                ).order_by('-name'),
+            }
+            for name, query in queries.items():
+                elapsed = self._time(query, options['repeat'])
+                self.stdout.write(f'{name:>16}: {elapsed * 1000:8.2f} ms')
+
+            transaction.set_rollback(True)
+
+    def _seed(self, options):
+        user = get_user_model().objects.create_user(
+            'benchmark-assigned-only@example.com'
+        )
+        tags = Tag.objects.bulk_create(
+            Tag(user=user, name=f'tag {index}')
+            for index in range(options['tags'])
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(user=user, title=f'recipe {index}',
+                   time_minutes=10, price=5)
+            for index in range(options['recipes'])
+        )
+        # Leave every other tag unused so the filter has work to do
+        used = tags[::2]
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(
+                recipe_id=recipe.pk,
+                tag_id=used[(index + offset) % len(used)].pk
+            )
+            for index, recipe in enumerate(recipes)
+            for offset in range(min(options['links'], len(used)))
+        )
+
+        return user
+
+    def _time(self, query, repeat):
+        """return the best wall time of evaluating the query"""
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(query())
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        return best
@@ -0,0 +1,82 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Prefetch
+
+from core.models import Ingredient, Recipe, Tag
+
+from recipe import rows
+from recipe.management.commands.seed_data import EMAIL
+from recipe.serializers import RecipeDetailSerializer, RecipeSerializer
+
+
+class Command(BaseCommand):
+    """Django command comparing the two ways of reading recipes
+
+    The recipes of a seeded user are read repeatedly through the
+    serializers and as values rows, in the list and the detail shape,
+    and the rows per second of each are reported.
+    """
+    help = 'Benchmark reading recipes through serializers against values'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', default=EMAIL.format(0))
+        parser.add_argument('--rows', type=int, default=500)
+        parser.add_argument('--duration', type=float, default=2)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(
+                f'No user {options["email"]}, run seed_data first.'
+            )
+        queryset = Recipe.objects.filter(user=user).order_by('-id')[
+            :options['rows']
+        ]
+
+        for shape, detail in (('list', False), ('detail', True)):
+            serialized = self._rate(
+                lambda: self._serialize(queryset, detail),
+                options['duration']
+            )
+            expand = rows.RELATIONS if detail else ()
+            represent = rows.representer(expand=expand)
+            values = self._rate(
+                lambda: [
+                    represent(row)
+                    for row in rows.select(queryset, expand=expand)
+                ],
+                options['duration']
+            )
+            self.stdout.write(
+                f'{shape:>6}: serializer {serialized:9.0f} rows/s  '
+                f'values {values:9.0f} rows/s  '
+                f'{values / serialized:5.1f}x'
+            )
+
+    def _serialize(self, queryset, detail):
+        serializer_class = RecipeSerializer
+        tags, ingredients = Tag.objects.all(), Ingredient.objects.all()
+        if detail:
+            serializer_class = RecipeDetailSerializer
+        else:
+            tags, ingredients = tags.only('id'), ingredients.only('id')
+
+        return serializer_class(
+            queryset.prefetch_related(
+                Prefetch('tags', queryset=tags.order_by('id')),
+                Prefetch('ingredients', queryset=ingredients.order_by('id'))
+            ),
+            many=True
+        ).data
+
+    def _rate(self, read, duration):
+        """return the rows read per second"""
+        count = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < duration:
+            count += len(read())
+
+        return count / (time.perf_counter() - start)
@@ -0,0 +1,103 @@
+import io
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core import parsers, renderers
+
+
+class Command(BaseCommand):
+    """Django command comparing the API encodings on recipe payloads
+
+    A page of recipes in the list shape and one in the detail shape are
+    encoded and decoded with DRF's JSON renderer and parser, the orjson
+    ones and, when msgpack is installed, MessagePack.
+    """
+    help = 'Benchmark encoding and decoding recipe payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int,
+            default=settings.REST_FRAMEWORK['PAGE_SIZE']
+        )
+        parser.add_argument('--duration', type=float, default=1)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        encodings = [
+            ('json', JSONRenderer(), JSONParser()),
+            ('orjson', renderers.ORJSONRenderer(), parsers.ORJSONParser()),
+        ]
+        if renderers.orjson is None:
+            self.stdout.write('orjson not installed, it falls back to json')
+        if renderers.msgpack is not None:
+            encodings.append((
+                'msgpack',
+                renderers.MessagePackRenderer(),
+                parsers.MessagePackParser()
+            ))
+
+        rng = random.Random(options['seed'])
+        for shape, detail in (('list', False), ('detail', True)):
+            page = self._page(rng, options['rows'], detail)
+            for name, renderer, parser in encodings:
+                content = renderer.render(page)
+                encode = self._rate(
+                    lambda: renderer.render(page), options['duration']
+                )
+                decode = self._rate(
+                    lambda: parser.parse(io.BytesIO(content)),
+                    options['duration']
+                )
+                rows = options['rows']
+                self.stdout.write(
+                    f'{shape:>6} {name:>8}: {len(content):8d} bytes  '
+                    f'encode {encode * rows:9.0f} rows/s  '
+                    f'decode {decode * rows:9.0f} rows/s'
+                )
+
+    def _page(self, rng, rows, detail):
+        """return a page of recipes shaped like the API's responses"""
+        def related(prefix, count):
+            ids = sorted(rng.sample(range(1, 1000), count))
+            if not detail:
+                return ids
+            return [{'id': pk, 'name': f'{prefix} {pk}'} for pk in ids]
+
+        results = []
+        for pk in range(rows, 0, -1):
+            image = f'uploads/recipe/{pk:08x}.jpg'
+            results.append({
+                'id': pk,
+                'title': f'Recipe {pk} with {rng.choice(["é", "a", "ü"])}',
+                'ingredients': related('Ingredient', rng.randint(0, 12)),
+                'tags': related('Tag', rng.randint(0, 5)),
+                'time_minutes': rng.randint(5, 120),
+                'price': f'{rng.uniform(1, 100):.2f}',
+                'link': f'https://example.com/recipes/{pk}',
+                'images': {
+                    size: f'/media/{image}.{size}.webp'
+                    for size in settings.RECIPE_IMAGE_DERIVATIVES
+                } if pk % 2 else None,
+            })
+
+        return {
+            'next': 'http://localhost:8000/api/recipe/recipes/?cursor=cD0x',
+            'previous': None,
+            'results': results,
+        }
+
+    def _rate(self, run, duration):
+        """return the runs per second"""
+        count = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < duration:
+            run()
+            count += 1
+
+        return count / (time.perf_counter() - start)
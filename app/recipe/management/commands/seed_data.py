@@ -0,0 +1,154 @@
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Ingredient, Recipe, Tag
+from core.search import update_search_vectors
+
+
+EMAIL = 'bench-user-{}@example.com'
+
+TAG_NAMES = (
+    'Breakfast', 'Dessert', 'Vegan', 'Vegetarian', 'Soup', 'Stew',
+    'Street food', 'Holiday', 'Quick', 'Grill', 'Seafood', 'Spicy',
+)
+INGREDIENT_NAMES = (
+    'Garlic', 'Onion', 'Soy sauce', 'Vinegar', 'Pork belly', 'Chicken',
+    'Rice', 'Coconut milk', 'Ginger', 'Tomato', 'Calamansi', 'Egg',
+    'Beef shank', 'Peanut butter', 'Shrimp paste', 'Eggplant', 'Sugar',
+)
+DISHES = (
+    'Adobo', 'Sinigang', 'Kare-kare', 'Pancit', 'Lumpia', 'Tinola',
+    'Sisig', 'Bulalo', 'Laing', 'Turon', 'Leche flan', 'Bistek',
+)
+STYLES = ('Classic', 'Spicy', 'Quick', 'Creamy', 'Grilled', "Lola's")
+
+
+def _names(base, count):
+    """return count distinct names built from the base names"""
+    return [
+        base[index % len(base)] +
+        (f' {index // len(base) + 1}' if index >= len(base) else '')
+        for index in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    """Django command filling the database with benchmark data
+
+    Every user gets the same password and their own tags, ingredients
+    and recipes. Recipes link to a random handful of each, so filters and
+    prefetches see a realistic fan-out. The same --seed always produces
+    the same data.
+    """
+    help = 'Seed benchmark users, recipes, tags and ingredients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument('--tags', type=int, default=30)
+        parser.add_argument('--ingredients', type=int, default=100)
+        parser.add_argument('--max-tags', type=int, default=5)
+        parser.add_argument('--max-ingredients', type=int, default=12)
+        parser.add_argument('--password', default='benchmark')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Delete earlier benchmark users and their data first.',
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        rng = random.Random(options['seed'])
+
+        with transaction.atomic():
+            if options['clear']:
+                deleted, _ = get_user_model().objects.filter(
+                    email__startswith='bench-user-',
+                    email__endswith='@example.com'
+                ).delete()
+                self.stdout.write(f'Deleted {deleted} rows')
+
+            users = self._users(options)
+            counts = {'tags': 0, 'ingredients': 0, 'recipes': 0, 'links': 0}
+            for user in users:
+                for name, value in self._seed_user(user, rng, options):
+                    counts[name] += value
+
+            update_search_vectors(Recipe.objects.filter(user__in=users))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(users)} users, {counts["recipes"]} recipes, '
+            f'{counts["tags"]} tags, {counts["ingredients"]} ingredients '
+            f'and {counts["links"]} links in '
+            f'{time.perf_counter() - start:.1f}s'
+        ))
+
+    def _users(self, options):
+        # Hashing once keeps seeding fast with slow password hashers.
+        password = make_password(options['password'])
+        return get_user_model().objects.bulk_create(
+            get_user_model()(
+                email=EMAIL.format(index),
+                name=f'Benchmark user {index}',
+                password=password
+            )
+            for index in range(options['users'])
+        )
+
+    def _seed_user(self, user, rng, options):
+        """create the user's data, yielding what was created"""
+        tags = Tag.objects.bulk_create(
+            Tag(user=user, name=name)
+            for name in _names(TAG_NAMES, options['tags'])
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(user=user, name=name)
+            for name in _names(INGREDIENT_NAMES, options['ingredients'])
+        )
+        recipes = Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    user=user,
+                    title=f'{rng.choice(STYLES)} {rng.choice(DISHES)}',
+                    time_minutes=rng.randint(5, 240),
+                    price=Decimal(rng.randint(100, 5000)) / 100
+                )
+                for _ in range(options['recipes'])
+            ),
+            batch_size=1000
+        )
+
+        tag_links = self._links(
+            Recipe.tags.through, 'tag_id', recipes, tags,
+            rng, options['max_tags']
+        )
+        ingredient_links = self._links(
+            Recipe.ingredients.through, 'ingredient_id', recipes,
+            ingredients, rng, options['max_ingredients']
+        )
+
+        yield 'tags', len(tags)
+        yield 'ingredients', len(ingredients)
+        yield 'recipes', len(recipes)
+        yield 'links', tag_links + ingredient_links
+
+    def _links(self, through, field, recipes, targets, rng, most):
+        """link each recipe to between one and most random targets"""
+        if not targets:
+            return 0
+
+        links = [
+            through(recipe_id=recipe.pk, **{field: target.pk})
+            for recipe in recipes
+            for target in rng.sample(
+                targets, rng.randint(1, min(most, len(targets)))
+            )
+        ]
+        through.objects.bulk_create(links, batch_size=5000)
+        return len(links)
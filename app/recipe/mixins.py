@@ -0,0 +1,419 @@
+import hashlib
+from calendar import timegm
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, \
+                      transaction
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, \
+                               patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ErrorDetail, ValidationError
+from rest_framework.response import Response
+
+from core.models import CollectionVersion
+from core.signals import deferred_collection_changes, \
+                         notify_collection_changed
+
+from recipe import cache
+from recipe.relations import ManyUserPrimaryKeyRelatedField, save_named
+
+
+class ConditionalGetMixin:
+    """Answer conditional GETs from the user's collection version
+
+    The validators come from a single primary key lookup, so a request
+    carrying a current ETag or Last-Modified date is answered with 304
+    without running the list query or the serializer.
+    """
+
+    def get_collection_version(self):
+        """return the requesting user's collection version"""
+        if not hasattr(self, '_collection_version'):
+            try:
+                self._collection_version = CollectionVersion.objects.get(
+                    user=self.request.user
+                )
+            except CollectionVersion.DoesNotExist:
+                # A replica may not have the primary's row yet.
+                self._collection_version, _ = CollectionVersion.objects \
+                    .using(DEFAULT_DB_ALIAS) \
+                    .get_or_create(user=self.request.user)
+
+        return self._collection_version
+
+    def get_etag(self, request, version):
+        """return the ETag of the requested representation"""
+        representation = '|'.join((
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+        ))
+        digest = hashlib.md5(representation.encode()).hexdigest()[:16]
+
+        return f'"{version.version}-{digest}"'
+
+    def get_last_modified(self, version):
+        """return the Last-Modified timestamp of the version, or None
+        while the version changed within the current second
+
+        The date only has a resolution of a second, so a later change in
+        the same second would not be told apart; the ETag is left to
+        validate such responses.
+        """
+        last_modified = timegm(version.modified_at.utctimetuple())
+        if last_modified >= timegm(timezone.now().utctimetuple()):
+            return None
+
+        return last_modified
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        """run the handler unless the client's copy is still current"""
+        version = self.get_collection_version()
+        etag = self.get_etag(request, version)
+        last_modified = self.get_last_modified(version)
+
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Accept', 'Authorization'))
+
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+
+class CachedResponseMixin:
+    """Serve list responses from the per-user response cache
+
+    Keys carry the user's collection version, so a write makes older
+    entries unreachable; they are left to expire.
+    """
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        """return cached response data or run the handler and cache it"""
+        key = cache.make_key(
+            request,
+            self.get_collection_version(),
+            self.action,
+            kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        )
+        data = cache.fetch(key)
+        if data is not None:
+            return Response(data)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.store(key, response.data)
+
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
+class BulkModelMixin:
+    """Create, update and delete lists of objects in one request
+
+    Every bulk request runs in a single transaction: rows are inserted
+    with one bulk insert, recipe links with one insert per relation, and
+    the owner's collection version is bumped once. Nothing is written
+    unless every item is valid; the response lists the errors per item.
+    """
+
+    def get_bulk_queryset(self):
+        """return the objects bulk requests may touch"""
+        return self.queryset.model.objects.filter(user=self.request.user)
+
+    def perform_bulk_write(self, objects):
+        """hook run inside the bulk transaction once objects are written"""
+
+    def get_bulk_serializer_context(self, items):
+        """return context shared by the serializers of every item, looked
+        up for the whole payload so items are not validated one query at
+        a time"""
+        return {'related_objects': self._resolve_related_objects(items)}
+
+    def _check_bulk_payload(self, data):
+        if not isinstance(data, list):
+            raise ValidationError({'detail': 'Expected a list of items.'})
+        if len(data) > settings.API_BULK_MAX_ITEMS:
+            raise ValidationError({
+                'detail': f'At most {settings.API_BULK_MAX_ITEMS} items.'
+            })
+
+    def _get_bulk_ids(self, data):
+        ids, errors = [], []
+        for item in data:
+            pk = item.get('id') if isinstance(item, dict) else item
+            if isinstance(pk, int) and not isinstance(pk, bool):
+                ids.append(pk)
+                errors.append({})
+            else:
+                ids.append(None)
+                errors.append({'id': ['A valid integer is required.']})
+
+        return ids, errors
+
+    def _duplicate_errors(self, items):
+        """return per item errors for items repeating the values of an
+        earlier item in fields that are unique per user
+
+        Items given as None are skipped.
+        """
+        model = self.queryset.model
+        errors = [{} for _ in items]
+        for fields in model._meta.unique_together:
+            if 'user' not in fields:
+                continue
+            fields = [field for field in fields if field != 'user']
+            seen = set()
+            for index, item in enumerate(items):
+                if item is None or not all(f in item for f in fields):
+                    continue
+                values = tuple(item[field] for field in fields)
+                if values in seen:
+                    errors[index].update({
+                        field: [ErrorDetail(
+                            'Repeats an earlier item.', code='unique'
+                        )]
+                        for field in fields
+                    })
+                seen.add(values)
+
+        return errors
+
+    def _split_relations(self, validated_data):
+        model = self.queryset.model
+        related = {
+            field.name: validated_data.pop(field.name)
+            for field in model._meta.many_to_many
+            if field.name in validated_data
+        }
+
+        return validated_data, related
+
+    def _resolve_related_objects(self, items):
+        """return the objects every item links to, with one query per
+        relation, keyed by field name and primary key"""
+        resolved = {}
+        for name, field in self.get_serializer().fields.items():
+            if not isinstance(field, ManyUserPrimaryKeyRelatedField) or \
+                    field.read_only:
+                continue
+
+            pks = set()
+            for item in items:
+                values = item.get(name) if isinstance(item, dict) else None
+                if not isinstance(values, list):
+                    continue
+                for value in values:
+                    try:
+                        if field.child_relation.to_name(value) is None:
+                            pks.add(field.child_relation.to_pk(value))
+                    except ValidationError:
+                        pass
+            resolved[name] = \
+                field.child_relation.get_queryset().in_bulk(pks) if pks else {}
+
+        return resolved
+
+    def _save_named_links(self, relations):
+        """store the related objects given by name, with one lookup and
+        one insert per relation for the whole payload"""
+        model = self.queryset.model
+        for field in model._meta.many_to_many:
+            changed = [
+                related for related in relations if field.name in related
+            ]
+            if not changed:
+                continue
+
+            groups = save_named(
+                field.related_model,
+                self.request.user,
+                [related[field.name] for related in changed]
+            )
+            for related, group in zip(changed, groups):
+                related[field.name] = group
+
+    def _replace_links(self, objects, relations, clear=True):
+        """replace the links of the objects with one insert per relation"""
+        model = self.queryset.model
+        for field in model._meta.many_to_many:
+            changed = [
+                (obj, related[field.name])
+                for obj, related in zip(objects, relations)
+                if field.name in related
+            ]
+            if not changed:
+                continue
+
+            through = field.remote_field.through
+            source = field.m2m_field_name()
+            target = field.m2m_reverse_field_name()
+            if clear:
+                through.objects.filter(**{
+                    f'{source}__in': [obj.pk for obj, _ in changed]
+                }).delete()
+            through.objects.bulk_create([
+                through(**{f'{source}_id': obj.pk, f'{target}_id': rel.pk})
+                for obj, related in changed
+                for rel in set(related)
+            ])
+
+    def _conflict_response(self):
+        return Response(
+            {'detail': 'Items conflict with each other or existing data.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    def _bulk_response(self, objects, status_code):
+        model = self.queryset.model
+        prefetch_related_objects(
+            objects,
+            *[field.name for field in model._meta.many_to_many]
+        )
+        serializer = self.get_serializer(objects, many=True)
+
+        return Response(serializer.data, status=status_code)
+
+    @action(methods=['POST'], detail=False, url_path='bulk', url_name='bulk')
+    def bulk_create(self, request):
+        """create every object in the payload"""
+        self._check_bulk_payload(request.data)
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.context.update(
+            self.get_bulk_serializer_context(request.data)
+        )
+        if not serializer.is_valid():
+            return Response(
+                {'errors': serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        errors = self._duplicate_errors(serializer.validated_data)
+        if any(errors):
+            return Response(
+                {'errors': errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        model = self.queryset.model
+        objects, relations = [], []
+        for item in serializer.validated_data:
+            fields, related = self._split_relations(dict(item))
+            objects.append(model(user=request.user, **fields))
+            relations.append(related)
+
+        connection = connections[model.objects.db]
+        try:
+            with transaction.atomic(), deferred_collection_changes():
+                if connection.features.can_return_ids_from_bulk_insert:
+                    model.objects.bulk_create(objects)
+                else:
+                    for obj in objects:
+                        obj.save()
+                self._save_named_links(relations)
+                self._replace_links(objects, relations, clear=False)
+                self.perform_bulk_write(objects)
+                notify_collection_changed(request.user.pk)
+        except IntegrityError:
+            return self._conflict_response()
+
+        return self._bulk_response(objects, status.HTTP_201_CREATED)
+
+    @bulk_create.mapping.patch
+    def bulk_update(self, request):
+        """partially update every object in the payload by id"""
+        self._check_bulk_payload(request.data)
+        ids, errors = self._get_bulk_ids(request.data)
+        instances = self.get_bulk_queryset().in_bulk(
+            [pk for pk in ids if pk is not None]
+        )
+
+        context = self.get_bulk_serializer_context(request.data)
+        valid, validated = [], [None] * len(ids)
+        for index, (pk, item) in enumerate(zip(ids, request.data)):
+            if pk is None:
+                continue
+            if pk not in instances:
+                errors[index] = {'id': ['Not found.']}
+                continue
+            serializer = self.get_serializer(
+                instances[pk], data=item, partial=True
+            )
+            serializer.context.update(context)
+            if serializer.is_valid():
+                valid.append(serializer)
+                validated[index] = serializer.validated_data
+            else:
+                errors[index] = serializer.errors
+
+        for index, duplicate in enumerate(self._duplicate_errors(validated)):
+            errors[index] = errors[index] or duplicate
+        if any(errors):
+            return Response(
+                {'errors': errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        objects, relations = [], []
+        try:
+            with transaction.atomic(), deferred_collection_changes():
+                for serializer in valid:
+                    fields, related = self._split_relations(
+                        dict(serializer.validated_data)
+                    )
+                    obj = serializer.instance
+                    for attr, value in fields.items():
+                        setattr(obj, attr, value)
+                    obj.save()
+                    objects.append(obj)
+                    relations.append(related)
+                self._save_named_links(relations)
+                self._replace_links(objects, relations)
+                self.perform_bulk_write(objects)
+                notify_collection_changed(request.user.pk)
+        except IntegrityError:
+            return self._conflict_response()
+
+        return self._bulk_response(objects, status.HTTP_200_OK)
+
+    @bulk_create.mapping.delete
+    def bulk_destroy(self, request):
+        """delete every object whose id is in the payload"""
+        self._check_bulk_payload(request.data)
+        ids, errors = self._get_bulk_ids(request.data)
+        instances = self.get_bulk_queryset().in_bulk(
+            [pk for pk in ids if pk is not None]
+        )
+        for index, pk in enumerate(ids):
+            if pk is not None and pk not in instances:
+                errors[index] = {'id': ['Not found.']}
+
+        if any(errors):
+            return Response(
+                {'errors': errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with transaction.atomic(), deferred_collection_changes():
+            self.get_bulk_queryset().filter(pk__in=instances).delete()
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
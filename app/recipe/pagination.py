@@ -0,0 +1,22 @@
+from django.conf import settings
+
+from rest_framework.pagination import CursorPagination
+
+
+class RecipeCursorPagination(CursorPagination):
+    """keyset pagination for recipes, newest first"""
+    ordering = '-id'
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        """order ranked search results by rank, best first"""
+        if 'search_rank' in queryset.query.annotations:
+            return ('-search_rank', '-id')
+
+        return super().get_ordering(request, queryset, view)
+
+
+class RecipeAttrCursorPagination(RecipeCursorPagination):
+    """keyset pagination for tags and ingredients, unique per user by name"""
+    ordering = '-name'
@@ -0,0 +1,172 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+
+SAVE_NAMED_ATTEMPTS = 3
+
+
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key relation limited to the requesting user's objects
+
+    With many=True the whole id list is resolved in one query and every
+    unknown id is reported at once. Ids of other users' objects are
+    reported as unknown.
+
+    Objects can also be given by name, as a string that is not a number
+    or as ``{"name": ...}``. A string of digits is always an id, as form
+    encoded payloads send ids as strings, so numeric names such as
+    ``"2024"`` must use the ``{"name": ...}`` form. Named objects are
+    returned unsaved; save_named swaps them for the user's stored objects
+    when the data is saved.
+    """
+    default_error_messages = {
+        'invalid_name': 'Names must be 1 to {max_length} characters long.',
+    }
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return ManyUserPrimaryKeyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        request = self.context.get('request')
+        if request is None:
+            return super().get_queryset().none()
+
+        return super().get_queryset().filter(user=request.user)
+
+    def to_name(self, data):
+        """return the name the data gives, or None when it is an id
+
+        Strings of digits are ids; numeric names need {"name": ...}.
+        """
+        if isinstance(data, dict):
+            name = data.get('name')
+        elif isinstance(data, str) and not data.strip().isdecimal():
+            name = data
+        else:
+            return None
+
+        max_length = self.queryset.model._meta.get_field('name').max_length
+        name = name.strip() if isinstance(name, str) else ''
+        if not name or len(name) > max_length:
+            self.fail('invalid_name', max_length=max_length)
+
+        return name
+
+    def to_pk(self, data):
+        """return the data as a primary key value, failing on bad types"""
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.queryset.model._meta.pk.to_python(data)
+        except (DjangoValidationError, TypeError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class ManyUserPrimaryKeyRelatedField(serializers.ManyRelatedField):
+    """Resolve a list of primary keys with a single IN query
+
+    Bulk views can resolve the ids of many payload items up front and put
+    the objects in the ``related_objects`` context, keyed by field name
+    and primary key; those are used instead of querying again.
+    """
+
+    def get_attribute(self, instance):
+        """return the linked objects ordered by id, as the list and detail
+        reads prefetch them"""
+        objects = super().get_attribute(instance)
+        prefetched = getattr(instance, '_prefetched_objects_cache', {})
+        if self.source not in prefetched and hasattr(objects, 'order_by'):
+            objects = objects.order_by('pk')
+
+        return objects
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        names = [child.to_name(item) for item in data]
+        pks = [
+            child.to_pk(item)
+            for item, name in zip(data, names) if name is None
+        ]
+        objects = self.resolve(pks)
+
+        missing = [pk for pk in dict.fromkeys(pks) if pk not in objects]
+        if missing:
+            message = child.error_messages['does_not_exist']
+            raise serializers.ValidationError(
+                [message.format(pk_value=pk) for pk in missing],
+                code='does_not_exist'
+            )
+
+        pks = iter(pks)
+        return [
+            objects[next(pks)] if name is None
+            else child.queryset.model(name=name)
+            for name in names
+        ]
+
+    def resolve(self, pks):
+        """return the objects with the primary keys, keyed by them"""
+        resolved = self.context.get('related_objects', {}).get(
+            self.field_name
+        )
+        if resolved is not None:
+            return {pk: resolved[pk] for pk in pks if pk in resolved}
+
+        if not pks:
+            return {}
+        return self.child_relation.get_queryset().in_bulk(set(pks))
+
+
+def save_named(model, user, groups):
+    """return the lists of objects with their unsaved objects swapped for
+    the user's stored objects of the same name
+
+    The names of all lists are looked up with one query and the missing
+    ones created with one insert. When a concurrent request creates one
+    of the names first, the insert fails on the per user unique name and
+    the lookup is repeated.
+    """
+    names = {obj.name for group in groups for obj in group if obj.pk is None}
+    stored = {}
+    for attempt in range(SAVE_NAMED_ATTEMPTS):
+        if not names - stored.keys():
+            break
+        stored.update(
+            (obj.name, obj)
+            for obj in model.objects.filter(
+                user=user, name__in=names - stored.keys()
+            )
+        )
+        # Sorted inserts take the unique index locks in the same order.
+        missing = [
+            model(user=user, name=name)
+            for name in sorted(names - stored.keys())
+        ]
+        if not missing:
+            break
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(missing)
+        except IntegrityError:
+            if attempt == SAVE_NAMED_ATTEMPTS - 1:
+                raise
+            continue
+        stored.update((obj.name, obj) for obj in missing)
+
+    return [
+        [stored[obj.name] if obj.pk is None else obj for obj in group]
+        for group in groups
+    ]
@@ -0,0 +1,122 @@
+"""
+Recipe representations read straight from the database.
+
+Listing through RecipeSerializer builds a model instance and runs the
+field machinery for every row. These helpers select the columns of the
+requested fields with values() and the linked ids, and names for
+expanded relations, as arrays in the same statement, then build the
+dicts the serializers would return, key for key.
+"""
+from django.contrib.postgres.fields import ArrayField
+from django.db import models
+from django.db.models import OuterRef, Subquery
+
+from core.models import Recipe
+
+from recipe import images
+
+
+FIELDS = ('id', 'title', 'ingredients', 'tags', 'time_minutes', 'price',
+          'link', 'images')
+RELATIONS = ('ingredients', 'tags')
+COLUMNS = {
+    'id': ('id',),
+    'title': ('title',),
+    'time_minutes': ('time_minutes',),
+    'price': ('price',),
+    'link': ('link',),
+    'images': ('image', 'image_derivatives'),
+}
+
+
+class ArraySubquery(Subquery):
+    """the rows of a single column subquery as an array, in its order"""
+    template = 'ARRAY(%(subquery)s)'
+
+
+def columns(fields):
+    """return the recipe columns the fields are read from
+
+    The id is always read, as pagination orders by it.
+    """
+    return ['id'] + [
+        column for field in fields
+        if field in COLUMNS and field != 'id'
+        for column in COLUMNS[field]
+    ]
+
+
+def _linked(field, column, output_field):
+    """return an array of a column of the objects linked through field,
+    ordered by their id"""
+    relation = Recipe._meta.get_field(field)
+    through = relation.remote_field.through
+    source = relation.m2m_field_name()
+    target = relation.m2m_reverse_field_name()
+
+    return ArraySubquery(
+        through.objects.filter(**{source: OuterRef('pk')})
+        .order_by(f'{target}_id')
+        .values(f'{target}_{column}' if column == 'id'
+                else f'{target}__{column}'),
+        output_field=ArrayField(output_field)
+    )
+
+
+def select(queryset, fields=FIELDS, expand=()):
+    """return the queryset as values rows carrying what the fields are
+    built from, with the names of the expanded relations
+
+    Annotations of the queryset are kept, so pagination can still order
+    by them.
+    """
+    arrays = {}
+    for field in RELATIONS:
+        if field not in fields:
+            continue
+        arrays[f'{field}_ids'] = _linked(field, 'id', models.IntegerField())
+        if field in expand:
+            arrays[f'{field}_names'] = _linked(
+                field, 'name', models.CharField()
+            )
+
+    return queryset.prefetch_related(None).annotate(**arrays).values(
+        *columns(fields), *queryset.query.annotations, *arrays
+    )
+
+
+def _related_getter(field, expanded):
+    ids, names = f'{field}_ids', f'{field}_names'
+    if not expanded:
+        return lambda row: row[ids]
+
+    return lambda row: [
+        {'id': pk, 'name': name} for pk, name in zip(row[ids], row[names])
+    ]
+
+
+def _getter(field, expand):
+    if field in RELATIONS:
+        return _related_getter(field, field in expand)
+    elif field == 'price':
+        return lambda row: '{:f}'.format(row['price'])
+    elif field == 'images':
+        return lambda row: images.derivative_urls(
+            row['image'], row['image_derivatives']
+        )
+
+    return lambda row: row[field]
+
+
+def representer(fields=FIELDS, expand=()):
+    """return a function building, from a row of select(), the recipe
+    representation of RecipeSerializer limited to the fields
+
+    Expanded relations are represented as RecipeDetailSerializer does.
+    """
+    getters = [(field, _getter(field, expand)) for field in fields]
+
+    def represent(row):
+        return {field: get(row) for field, get in getters}
+
+    return represent
@@ -1,9 +1,48 @@
+from django.db import transaction
+
 from rest_framework import serializers
 
+from core.metrics import TimedSerializerMixin
 from core.models import Tag, Ingredient, Recipe
 
+from recipe import images
+from recipe.relations import UserPrimaryKeyRelatedField, save_named
+
+
+class RecipeAttrSerializer(TimedSerializerMixin,
+                           serializers.ModelSerializer):
+    """Base serializer for objects whose names are unique per user"""
+
+    def _name_taken(self, value):
+        existing = self.context.get('existing_names')
+        if existing is not None:
+            return value in existing and (
+                self.instance is None or existing[value] != self.instance.pk
+            )
+
+        request = self.context.get('request')
+        others = self.Meta.model.objects.filter(user=request.user, name=value)
+        if self.instance is not None:
+            others = others.exclude(pk=self.instance.pk)
+        return others.exists()
+
+    def validate_name(self, value):
+        """check the requesting user has no other object with the name
+
+        Bulk requests pass the ids of the existing objects named in the
+        payload as ``existing_names``, looked up in one query.
+        """
+        if self._name_taken(value):
+            raise serializers.ValidationError(
+                f'You already have a {self.Meta.model._meta.verbose_name} '
+                f'with this name.',
+                code='unique'
+            )
 
-class TagSerializer(serializers.ModelSerializer):
+        return value
+
+
+class TagSerializer(RecipeAttrSerializer):
     """Serializer tag objects"""
 
     class Meta:
@@ -12,7 +51,7 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(RecipeAttrSerializer):
     """Serialize ingredient objects"""
 
     class Meta:
@@ -21,23 +60,94 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class TagCountSerializer(TagSerializer):
+    """Serialize tag objects with the number of recipes using them"""
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ('recipe_count',)
+
+
+class IngredientCountSerializer(IngredientSerializer):
+    """Serialize ingredient objects with the number of recipes using them"""
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ('recipe_count',)
+
+
+class ImageDerivativesField(serializers.ReadOnlyField):
+    """the urls of the derivatives of the recipe image"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', '*')
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return images.derivative_urls(
+            value.image.name, value.image_derivatives
+        )
+
+
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """serialize recipe onjects"""
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
+    images = ImageDerivativesField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'title', 'ingredients', 'tags', 'time_minutes',
-                  'price', 'link')
+                  'price', 'link', 'images')
         read_only_fields = ('id',)
 
+    def get_fields(self):
+        """return the fields named in the context's fields, if given,
+        with the relations in its expand represented as objects"""
+        fields = super().get_fields()
+        expanded = {
+            'ingredients': IngredientSerializer,
+            'tags': TagSerializer,
+        }
+        for name in self.context.get('expand', ()):
+            fields[name] = expanded[name](many=True, read_only=True)
+
+        requested = self.context.get('fields')
+        if requested is not None:
+            for name in list(fields):
+                if name not in requested:
+                    del fields[name]
+
+        return fields
+
+    def save_named_relations(self, validated_data):
+        """store the tags and ingredients given by name"""
+        user = self.context['request'].user
+        for name in ('tags', 'ingredients'):
+            if name in validated_data:
+                model = self.fields[name].child_relation.queryset.model
+                validated_data[name], = save_named(
+                    model, user, [validated_data[name]]
+                )
+
+        return validated_data
+
+    def create(self, validated_data):
+        with transaction.atomic(savepoint=False):
+            return super().create(self.save_named_relations(validated_data))
+
+    def update(self, instance, validated_data):
+        with transaction.atomic(savepoint=False):
+            return super().update(
+                instance, self.save_named_relations(validated_data)
+            )
+
 
 class RecipeDetailSerializer(RecipeSerializer):
     """Serialize a recipe detail"""
@@ -45,10 +155,12 @@ class RecipeDetailSerializer(RecipeSerializer):
     tags = TagSerializer(many=True, read_only=True)
 
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+class RecipeImageSerializer(TimedSerializerMixin,
+                            serializers.ModelSerializer):
     """Serializer for uploading images to recipes"""
+    images = ImageDerivativesField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
+        fields = ('id', 'image', 'images')
         read_only_fields = ('id',)
@@ -0,0 +1,276 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import CollectionVersion, Ingredient, Recipe, Tag
+
+
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+
+
+class BulkApiTests(TestCase):
+    """test the bulk recipe, tag and ingredient endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'aljon@yahoo.com',
+            'testing1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.version = CollectionVersion.objects.create(user=self.user)
+
+    def test_bulk_create_tags(self):
+        """test creating several tags in one request"""
+        payload = [{'name': 'Vegan'}, {'name': 'Dessert'}]
+
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 2)
+        names = Tag.objects.filter(user=self.user).values_list(
+            'name', flat=True
+        )
+        self.assertEqual(set(names), {'Vegan', 'Dessert'})
+
+    def test_bulk_create_existing_names(self):
+        """test items named like the user's objects are reported per item"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        payload = [{'name': 'Dessert'}, {'name': ' Vegan '}]
+
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['errors'][0], {})
+        self.assertEqual(res.data['errors'][1]['name'][0].code, 'unique')
+
+    def test_bulk_update_keeps_own_name(self):
+        """test an item may keep its own name but not take another's"""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        dessert = Tag.objects.create(user=self.user, name='Dessert')
+        payload = [
+            {'id': vegan.id, 'name': 'Vegan'},
+            {'id': dessert.id, 'name': 'Vegan'},
+        ]
+
+        res = self.client.patch(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['errors'][0], {})
+        self.assertEqual(res.data['errors'][1]['name'][0].code, 'unique')
+
+    def test_bulk_create_recipes_with_links(self):
+        """test creating recipes links their tags and ingredients"""
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        ingredient = Ingredient.objects.create(user=self.user, name='Pork')
+        payload = [
+            {
+                'title': f'Recipe {index}',
+                'time_minutes': 10,
+                'price': '5.00',
+                'tags': [tag.id],
+                'ingredients': [ingredient.id],
+            }
+            for index in range(3)
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 3)
+        for recipe in recipes:
+            self.assertEqual(list(recipe.tags.all()), [tag])
+            self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+        self.assertEqual(res.data[0]['tags'], [tag.id])
+
+    def test_bulk_create_recipes_with_named_links(self):
+        """test names shared by several items create one object"""
+        payload = [
+            {
+                'title': f'Recipe {index}',
+                'time_minutes': 5,
+                'price': '2.00',
+                'tags': ['Dinner'],
+                'ingredients': ['Pork', f'Spice {index}'],
+            }
+            for index in range(2)
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        tag = Tag.objects.get(user=self.user)
+        self.assertEqual(tag.name, 'Dinner')
+        self.assertEqual(tag.recipe_set.count(), 2)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 3
+        )
+
+    def test_bulk_create_bumps_version_once(self):
+        """test a bulk create notifies about the change once"""
+        payload = [{'name': 'One'}, {'name': 'Two'}, {'name': 'Three'}]
+
+        self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.version.refresh_from_db()
+        self.assertEqual(self.version.version, 1)
+
+    def test_bulk_create_reports_item_errors(self):
+        """test nothing is created when an item is invalid"""
+        payload = [{'name': 'Valid'}, {'name': ''}]
+
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['errors'][0], {})
+        self.assertIn('name', res.data['errors'][1])
+        self.assertFalse(Tag.objects.exists())
+
+    def test_bulk_create_requires_list(self):
+        """test a single object payload is rejected"""
+        res = self.client.post(TAGS_BULK_URL, {'name': 'x'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch('django.conf.settings.API_BULK_MAX_ITEMS', 1)
+    def test_bulk_create_limited(self):
+        """test payloads above the item limit are rejected"""
+        payload = [{'name': 'One'}, {'name': 'Two'}]
+
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Tag.objects.exists())
+
+    def test_bulk_update_recipes(self):
+        """test updating fields and links of several recipes"""
+        tag1 = Tag.objects.create(user=self.user, name='Old')
+        tag2 = Tag.objects.create(user=self.user, name='New')
+        recipes = [
+            Recipe.objects.create(
+                user=self.user, title=f'Recipe {index}',
+                time_minutes=5, price=2.00
+            )
+            for index in range(2)
+        ]
+        for recipe in recipes:
+            recipe.tags.add(tag1)
+        payload = [
+            {'id': recipes[0].id, 'title': 'Renamed'},
+            {'id': recipes[1].id, 'tags': [tag2.id]},
+        ]
+
+        res = self.client.patch(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipes[0].refresh_from_db()
+        self.assertEqual(recipes[0].title, 'Renamed')
+        self.assertEqual(list(recipes[0].tags.all()), [tag1])
+        self.assertEqual(list(recipes[1].tags.all()), [tag2])
+
+    def test_bulk_update_other_users_objects(self):
+        """test another user's objects cannot be updated"""
+        other = get_user_model().objects.create_user(
+            'other@yahoo.com',
+            'testing1234'
+        )
+        tag = Tag.objects.create(user=other, name='Theirs')
+
+        res = self.client.patch(
+            TAGS_BULK_URL,
+            [{'id': tag.id, 'name': 'Mine'}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['errors'][0], {'id': ['Not found.']})
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Theirs')
+
+    def test_bulk_delete(self):
+        """test deleting several objects of the user"""
+        other = get_user_model().objects.create_user(
+            'other@yahoo.com',
+            'testing1234'
+        )
+        mine = [Tag.objects.create(user=self.user, name=str(i))
+                for i in range(3)]
+        theirs = Tag.objects.create(user=other, name='Theirs')
+        self.version.refresh_from_db()
+        before = self.version.version
+
+        res = self.client.delete(
+            TAGS_BULK_URL,
+            [tag.id for tag in mine],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Tag.objects.filter(user=self.user).exists())
+        self.assertTrue(Tag.objects.filter(id=theirs.id).exists())
+        self.version.refresh_from_db()
+        self.assertEqual(self.version.version, before + 1)
+
+    def test_bulk_delete_unknown_ids(self):
+        """test missing and foreign ids are reported and nothing is
+        deleted"""
+        other = get_user_model().objects.create_user(
+            'other@yahoo.com',
+            'testing1234'
+        )
+        mine = Tag.objects.create(user=self.user, name='Mine')
+        theirs = Tag.objects.create(user=other, name='Theirs')
+
+        res = self.client.delete(
+            TAGS_BULK_URL,
+            [mine.id, theirs.id, theirs.id + 1000],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['errors'], [
+            {},
+            {'id': ['Not found.']},
+            {'id': ['Not found.']},
+        ])
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_bulk_create_duplicate_names(self):
+        """test names repeated within a payload are reported per item"""
+        payload = [{'name': 'Same'}, {'name': 'Other'}, {'name': 'Same'}]
+
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['errors'], [
+            {},
+            {},
+            {'name': ['Repeats an earlier item.']},
+        ])
+        self.assertFalse(Tag.objects.exists())
+
+    def test_bulk_update_duplicate_names(self):
+        """test two items renamed alike in one payload are reported"""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        dessert = Tag.objects.create(user=self.user, name='Dessert')
+        payload = [
+            {'id': vegan.id, 'name': 'Sweet'},
+            {'id': dessert.id, 'name': 'Sweet'},
+        ]
+
+        res = self.client.patch(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['errors'], [
+            {},
+            {'name': ['Repeats an earlier item.']},
+        ])
+        vegan.refresh_from_db()
+        self.assertEqual(vegan.name, 'Vegan')
@@ -0,0 +1,160 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import CollectionVersion, Ingredient, Recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+def detail_url(recipe_id):
+    """return recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ConditionalGetTests(TestCase):
+    """test conditional requests against the recipe API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'aljon@yahoo.com',
+            'testing1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Adobo',
+            time_minutes=45,
+            price=8.00
+        )
+        CollectionVersion.objects.create(user=self.user)
+        CollectionVersion.objects.filter(user=self.user).update(
+            modified_at=timezone.now() - timedelta(minutes=1)
+        )
+
+    def test_validators_returned(self):
+        """test list and detail responses carry validators"""
+        for url in (RECIPES_URL, detail_url(self.recipe.id),
+                    TAGS_URL, INGREDIENTS_URL):
+            res = self.client.get(url)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertIn('ETag', res)
+            self.assertIn('Last-Modified', res)
+
+    def test_matching_etag_not_modified(self):
+        """test a current ETag is answered without running the list"""
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_if_modified_since_not_modified(self):
+        """test a current Last-Modified date is answered with 304"""
+        last_modified = self.client.get(TAGS_URL)['Last-Modified']
+
+        res = self.client.get(TAGS_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_change_modified(self):
+        """test a change is not answered with 304 by If-Modified-Since"""
+        last_modified = self.client.get(TAGS_URL)['Last-Modified']
+        Tag.objects.create(user=self.user, name='Dessert')
+
+        res = self.client.get(TAGS_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_no_last_modified_within_second_of_change(self):
+        """test Last-Modified is left out while the collection changed in
+        the current second, and the ETag still validates"""
+        Tag.objects.create(user=self.user, name='Dessert')
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertNotIn('Last-Modified', res)
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_differs_per_query(self):
+        """test different query strings get different ETags"""
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'tags': '1'},
+            HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_recipe_change_invalidates(self):
+        """test writing a recipe changes the list ETag"""
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        self.recipe.title = 'Chicken adobo'
+        self.recipe.save()
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_tag_change_invalidates_detail(self):
+        """test renaming a linked tag changes the recipe detail ETag"""
+        tag = Tag.objects.create(user=self.user, name='Main')
+        self.recipe.tags.add(tag)
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        tag.name = 'Main course'
+        tag.save()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Main course')
+
+    def test_link_change_invalidates(self):
+        """test linking an ingredient changes the ingredient list ETag"""
+        ingredient = Ingredient.objects.create(user=self.user, name='Garlic')
+        url = f'{INGREDIENTS_URL}?assigned_only=1'
+        etag = self.client.get(url)['ETag']
+
+        self.recipe.ingredients.add(ingredient)
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_other_user_changes_ignored(self):
+        """test another user's writes do not change the ETag"""
+        etag = self.client.get(RECIPES_URL)['ETag']
+        other = get_user_model().objects.create_user(
+            'other@yahoo.com',
+            'testing1234'
+        )
+
+        Tag.objects.create(user=other, name='Other')
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_user_with_version_deleted(self):
+        """test deleting a user cascades through the version counter"""
+        self.client.get(RECIPES_URL)
+
+        self.user.delete()
+
+        self.assertFalse(Recipe.objects.exists())
@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def read_stream(res):
+    """return the decoded body of a streaming response"""
+    return b''.join(res.streaming_content).decode()
+
+
+class RecipeExportApiTests(TestCase):
+    """test streaming a user's recipe book"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'aljon@yahoo.com',
+            'testing1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Kare-kare',
+            time_minutes=120,
+            price=15.50
+        )
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Stew'))
+        self.recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Oxtail')
+        )
+
+    def test_export_requires_auth(self):
+        """test exporting requires authentication"""
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=1)
+    def test_export_ndjson(self):
+        """test recipes are streamed one json document per line"""
+        Recipe.objects.create(
+            user=self.user, title='Turon', time_minutes=15, price=1.00
+        )
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in read_stream(res).splitlines()]
+        titles = [row['title'] for row in rows]
+        self.assertEqual(titles, ['Turon', 'Kare-kare'])
+        self.assertEqual(rows[1]['price'], '15.50')
+        self.assertEqual(rows[1]['tags'][0]['name'], 'Stew')
+        self.assertEqual(rows[1]['ingredients'][0]['name'], 'Oxtail')
+        self.assertEqual(rows[0]['tags'], [])
+
+    def test_export_without_server_side_cursors(self):
+        """test exporting behind a transaction pooler uses plain cursors"""
+        settings_dict = {'DISABLE_SERVER_SIDE_CURSORS': True}
+        with patch.dict(connection.settings_dict, settings_dict), \
+                patch.object(connection, 'chunked_cursor') as chunked:
+            res = self.client.get(EXPORT_URL)
+            rows = read_stream(res).splitlines()
+
+        chunked.assert_not_called()
+        self.assertEqual(json.loads(rows[0])['title'], 'Kare-kare')
+
+    def test_export_csv(self):
+        """test recipes are streamed as csv rows"""
+        res = self.client.get(EXPORT_URL, {'output': 'csv'})
+
+        rows = list(csv.DictReader(io.StringIO(read_stream(res))))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Kare-kare')
+        self.assertEqual(json.loads(rows[0]['tags']), ['Stew'])
+        self.assertEqual(json.loads(rows[0]['ingredients']), ['Oxtail'])
+
+    def test_export_csv_names_kept_whole(self):
+        """test names holding separators survive the csv export"""
+        self.recipe.tags.add(
+            Tag.objects.create(user=self.user, name='Sweet; "sour", hot')
+        )
+
+        res = self.client.get(EXPORT_URL, {'output': 'csv'})
+
+        row = next(csv.DictReader(io.StringIO(read_stream(res))))
+        self.assertEqual(
+            json.loads(row['tags']), ['Stew', 'Sweet; "sour", hot']
+        )
+        self.assertEqual(len(json.loads(row['tag_ids'])), 2)
+
+    def test_export_limited_to_user(self):
+        """test only the user's recipes are exported"""
+        other = get_user_model().objects.create_user(
+            'other@yahoo.com',
+            'testing1234'
+        )
+        Recipe.objects.create(
+            user=other, title='Theirs', time_minutes=5, price=1.00
+        )
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(len(read_stream(res).splitlines()), 1)
+
+    def test_export_format_from_accept(self):
+        """test the Accept header picks the export format"""
+        for media_type in ('text/csv', 'application/x-ndjson'):
+            res = self.client.get(EXPORT_URL, HTTP_ACCEPT=media_type)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res['Content-Type'], media_type)
+
+        res = self.client.get(EXPORT_URL, HTTP_ACCEPT='text/csv')
+        rows = list(csv.DictReader(io.StringIO(read_stream(res))))
+        self.assertEqual(rows[0]['title'], 'Kare-kare')
+
+    def test_export_error_with_accept(self):
+        """test errors are reported when an export format is accepted"""
+        res = self.client.get(
+            EXPORT_URL, {'output': 'xml'}, HTTP_ACCEPT='text/csv'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('output', json.loads(res.content))
+
+    def test_export_invalid_output(self):
+        """test unknown output formats are rejected"""
+        res = self.client.get(EXPORT_URL, {'output': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
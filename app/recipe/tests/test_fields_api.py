@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class SparseFieldsApiTests(TestCase):
+    """test choosing and expanding the fields of recipe reads"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'aljon@yahoo.com',
+            'testing1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Dessert')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='Mango'
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Mango float', time_minutes=10, price=5
+        )
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+
+    def test_fields_trim_list(self):
+        """test only the requested fields are listed, in the usual order"""
+        res = self.client.get(RECIPES_URL, {'fields': 'title,id'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'],
+            [{'id': self.recipe.id, 'title': 'Mango float'}]
+        )
+
+    def test_fields_trim_select(self):
+        """test columns of fields left out are not selected"""
+        for values_reads in (True, False):
+            for cache in caches.all():
+                cache.clear()
+            with self.settings(RECIPE_VALUES_READS=values_reads), \
+                    CaptureQueriesContext(connection) as ctx:
+                self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+            sql = ' '.join(query['sql'] for query in ctx.captured_queries)
+            self.assertIn('"core_recipe"."title"', sql)
+            self.assertNotIn('"core_recipe"."link"', sql)
+            self.assertNotIn('core_recipe_tags', sql)
+
+    def test_expand_list(self):
+        """test expanded relations are listed as objects"""
+        res = self.client.get(RECIPES_URL, {'expand': 'tags'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        result = res.data['results'][0]
+        self.assertEqual(
+            result['tags'], [{'id': self.tag.id, 'name': 'Dessert'}]
+        )
+        self.assertEqual(result['ingredients'], [self.ingredient.id])
+
+    def test_fields_trim_detail(self):
+        """test the detail is trimmed and keeps its expanded relations"""
+        res = self.client.get(
+            detail_url(self.recipe.id), {'fields': 'ingredients'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'ingredients': [{'id': self.ingredient.id, 'name': 'Mango'}]
+        })
+
+    def test_unknown_fields_rejected(self):
+        """test unknown fields and expansions are a bad request"""
+        for params in ({'fields': 'id,user'}, {'expand': 'title'}):
+            res = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(list(params)[0], res.data)
+
+    def test_writes_return_every_field(self):
+        """test fields only trims reads"""
+        res = self.client.patch(
+            detail_url(self.recipe.id) + '?fields=id',
+            {'title': 'Renamed'},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Renamed')
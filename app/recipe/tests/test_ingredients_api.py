@@ -47,7 +47,7 @@ class PrivateIngredientApiTests(TestCase):
         ingredients = Ingredient.objects.all().order_by('-name')
         serializer = IngredientSerializer(ingredients, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredient_limited_to_user(self):
         """TEst taht ingredient is for Aurhenticated user only"""
@@ -61,8 +61,8 @@ class PrivateIngredientApiTests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], ingredient.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], ingredient.name)
 
     def test_create_ingredient_succesful(self):
         """test create new ingredient"""
@@ -98,8 +98,8 @@ class PrivateIngredientApiTests(TestCase):
 
         serializer1 = IngredientSerializer(ingredient1)
         serializer2 = IngredientSerializer(ingredient2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrieve_ingredient_assigned_unique(self):
         """test filtering tags by assigned returns unique items"""
@@ -122,4 +122,25 @@ class PrivateIngredientApiTests(TestCase):
 
         res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_retrieve_ingredients_with_counts(self):
+        """test ingredients can include the number of recipes using them"""
+        ingredient = Ingredient.objects.create(user=self.user, name='Garlic')
+        Ingredient.objects.create(user=self.user, name='Saffron')
+        for title in ('Garlic rice', 'Adobo'):
+            recipe = Recipe.objects.create(
+                title=title,
+                time_minutes=5,
+                price=3.00,
+                user=self.user
+            )
+            recipe.ingredients.add(ingredient)
+
+        res = self.client.get(INGREDIENTS_URL, {'with_counts': 1})
+
+        counts = {
+            item['name']: item['recipe_count']
+            for item in res.data['results']
+        }
+        self.assertEqual(counts, {'Saffron': 0, 'Garlic': 2})
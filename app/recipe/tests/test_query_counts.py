@@ -0,0 +1,367 @@
+import io
+import os
+from itertools import count
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from core.tests.utils import QueryCountMixin
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def image():
+    """return an in memory jpeg to upload"""
+    upload = io.BytesIO()
+    Image.new('RGB', (10, 10)).save(upload, format='JPEG')
+    upload.name = 'upload.jpeg'
+    upload.seek(0)
+    return upload
+
+
+class QueryCountTests(QueryCountMixin, TestCase):
+    """test every recipe API action makes a fixed number of queries"""
+    query_baseline = os.path.join(
+        os.path.dirname(__file__), 'query_counts.json'
+    )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'aljon@yahoo.com',
+            'testing1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.serial = count()
+        self.tag = Tag.objects.create(user=self.user, name='Dinner')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='Garlic'
+        )
+        self.recipe = self.sample_recipe()
+
+    def sample_recipe(self):
+        return Recipe.objects.create(
+            user=self.user,
+            title=f'Recipe {next(self.serial)}',
+            time_minutes=10,
+            price=5.00
+        )
+
+    def grow(self, size):
+        """add recipes linked to their own and the shared tags and
+        ingredients"""
+        for _ in range(size):
+            recipe = self.sample_recipe()
+            name = f'Extra {next(self.serial)}'
+            recipe.tags.add(
+                self.tag, Tag.objects.create(user=self.user, name=name)
+            )
+            recipe.ingredients.add(
+                self.ingredient,
+                Ingredient.objects.create(user=self.user, name=name)
+            )
+
+    def recipe_payload(self, **params):
+        payload = {
+            'title': f'New {next(self.serial)}',
+            'time_minutes': 20,
+            'price': '7.00',
+            'tags': [self.tag.id],
+            'ingredients': [self.ingredient.id],
+        }
+        payload.update(params)
+        return payload
+
+    def test_recipe_list(self):
+        """test listing recipes"""
+        self.assertConstantQueries(
+            'recipe-list',
+            lambda: self.client.get(RECIPES_URL),
+            self.grow
+        )
+
+    def test_recipe_list_filtered(self):
+        """test listing recipes filtered by tags and ingredients"""
+        self.assertConstantQueries(
+            'recipe-list-filtered',
+            lambda: self.client.get(RECIPES_URL, {
+                'tags': self.tag.id,
+                'ingredients': self.ingredient.id,
+            }),
+            self.grow
+        )
+
+    def test_recipe_list_search(self):
+        """test searching recipes"""
+        self.assertConstantQueries(
+            'recipe-list-search',
+            lambda: self.client.get(RECIPES_URL, {'search': 'recipe'}),
+            self.grow
+        )
+
+    def test_recipe_list_expanded(self):
+        """test listing recipes with their tags and ingredients inlined"""
+        self.assertConstantQueries(
+            'recipe-list-expanded',
+            lambda: self.client.get(
+                RECIPES_URL, {'expand': 'tags,ingredients'}
+            ),
+            self.grow
+        )
+
+    def test_recipe_retrieve(self):
+        """test viewing a recipe"""
+        self.recipe.tags.add(self.tag)
+        self.assertConstantQueries(
+            'recipe-detail',
+            lambda: self.client.get(detail_url(self.recipe.id)),
+            self.grow
+        )
+
+    def test_recipe_create(self):
+        """test creating a recipe with links"""
+        self.assertConstantQueries(
+            'recipe-create',
+            lambda: self.client.post(
+                RECIPES_URL, self.recipe_payload(), format='json'
+            ),
+            self.grow
+        )
+
+    def test_recipe_update(self):
+        """test replacing a recipe"""
+        self.assertConstantQueries(
+            'recipe-update',
+            lambda: self.client.put(
+                detail_url(self.recipe.id), self.recipe_payload(),
+                format='json'
+            ),
+            self.grow
+        )
+
+    def test_recipe_partial_update(self):
+        """test renaming a recipe"""
+        self.assertConstantQueries(
+            'recipe-partial-update',
+            lambda: self.client.patch(
+                detail_url(self.recipe.id), {'title': 'Renamed'},
+                format='json'
+            ),
+            self.grow
+        )
+
+    def test_recipe_destroy(self):
+        """test deleting a recipe"""
+        def prepare():
+            recipe = self.sample_recipe()
+            recipe.tags.add(self.tag)
+            return (recipe.id,)
+
+        self.assertConstantQueries(
+            'recipe-destroy',
+            lambda recipe_id: self.client.delete(detail_url(recipe_id)),
+            self.grow,
+            prepare
+        )
+
+    def test_recipe_upload_image(self):
+        """test uploading a recipe image"""
+        url = reverse('recipe:recipe-upload-image', args=[self.recipe.id])
+        self.assertConstantQueries(
+            'recipe-upload-image',
+            lambda upload: self.client.post(
+                url, {'image': upload}, format='multipart'
+            ),
+            self.grow,
+            lambda: (image(),)
+        )
+
+    def test_recipe_export(self):
+        """test exporting recipes"""
+        def export():
+            res = self.client.get(EXPORT_URL)
+            b''.join(res.streaming_content)
+            return res
+
+        self.assertConstantQueries('recipe-export', export, self.grow)
+
+    def test_recipe_bulk_create(self):
+        """test creating recipes in bulk"""
+        self.assertConstantQueries(
+            'recipe-bulk-create',
+            lambda: self.client.post(
+                RECIPES_BULK_URL,
+                [self.recipe_payload(), self.recipe_payload()],
+                format='json'
+            ),
+            self.grow
+        )
+
+    def test_recipe_create_many_links(self):
+        """test the links of a new recipe are checked in one query"""
+        tags, ingredients = [], []
+
+        def grow(size):
+            for _ in range(size):
+                name = f'Linked {next(self.serial)}'
+                tags.append(Tag.objects.create(user=self.user, name=name))
+                ingredients.append(
+                    Ingredient.objects.create(user=self.user, name=name)
+                )
+
+        self.assertConstantQueries(
+            'recipe-create-many-links',
+            lambda: self.client.post(RECIPES_URL, self.recipe_payload(
+                tags=[tag.id for tag in tags],
+                ingredients=[ingredient.id for ingredient in ingredients]
+            ), format='json'),
+            grow
+        )
+
+    def test_recipe_create_named_links(self):
+        """test links given by name are stored with one lookup and one
+        insert per relation"""
+        names = []
+
+        def grow(size):
+            names.extend(f'Named {next(self.serial)}' for _ in range(size))
+
+        self.assertConstantQueries(
+            'recipe-create-named-links',
+            lambda: self.client.post(RECIPES_URL, self.recipe_payload(
+                tags=[self.tag.name] + [f'{name} tag' for name in names],
+                ingredients=[f'{name} {next(self.serial)}' for name in names]
+            ), format='json'),
+            grow
+        )
+
+    def test_recipe_bulk_create_many_items(self):
+        """test the links of every item are checked together"""
+        items = []
+
+        def grow(size):
+            for _ in range(size):
+                name = f'Linked {next(self.serial)}'
+                items.append((
+                    Tag.objects.create(user=self.user, name=name),
+                    Ingredient.objects.create(user=self.user, name=name)
+                ))
+
+        self.assertConstantQueries(
+            'recipe-bulk-create-many-items',
+            lambda: self.client.post(RECIPES_BULK_URL, [
+                self.recipe_payload(tags=[tag.id], ingredients=[ingredient.id])
+                for tag, ingredient in items
+            ], format='json'),
+            grow
+        )
+
+    def test_recipe_bulk_update(self):
+        """test updating recipes in bulk"""
+        other = self.sample_recipe()
+        self.assertConstantQueries(
+            'recipe-bulk-update',
+            lambda: self.client.patch(RECIPES_BULK_URL, [
+                {'id': self.recipe.id, 'title': 'Renamed'},
+                {'id': other.id, 'tags': [self.tag.id]},
+            ], format='json'),
+            self.grow
+        )
+
+    def test_recipe_bulk_destroy(self):
+        """test deleting recipes in bulk"""
+        self.assertConstantQueries(
+            'recipe-bulk-destroy',
+            lambda ids: self.client.delete(
+                RECIPES_BULK_URL, ids, format='json'
+            ),
+            self.grow,
+            lambda: ([self.sample_recipe().id, self.sample_recipe().id],)
+        )
+
+
+class RecipeAttrQueryCountTests(QueryCountMixin, TestCase):
+    """test every tag and ingredient action makes a fixed number of
+    queries"""
+    query_baseline = QueryCountTests.query_baseline
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'aljon@yahoo.com',
+            'testing1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.serial = count()
+
+    def grow(self, model):
+        def grow(size):
+            for _ in range(size):
+                recipe = Recipe.objects.create(
+                    user=self.user, title='Recipe', time_minutes=5, price=1
+                )
+                getattr(recipe, f'{model.__name__.lower()}s').add(
+                    model.objects.create(
+                        user=self.user, name=f'Name {next(self.serial)}'
+                    )
+                )
+        return grow
+
+    def check_actions(self, model):
+        name = model.__name__.lower()
+        list_url = reverse(f'recipe:{name}-list')
+        bulk_url = reverse(f'recipe:{name}-bulk')
+        grow = self.grow(model)
+
+        for params, suffix in (
+                ({}, 'list'),
+                ({'assigned_only': 1}, 'list-assigned'),
+                ({'with_counts': 1}, 'list-counts')):
+            self.assertConstantQueries(
+                f'{name}-{suffix}',
+                lambda: self.client.get(list_url, params),
+                grow
+            )
+
+        self.assertConstantQueries(
+            f'{name}-create',
+            lambda: self.client.post(
+                list_url, {'name': f'New {next(self.serial)}'}
+            ),
+            grow
+        )
+
+        items = [None]
+
+        def grow_items(size):
+            grow(size)
+            items.extend([None] * size)
+
+        self.assertConstantQueries(
+            f'{name}-bulk-create',
+            lambda: self.client.post(bulk_url, [
+                {'name': f'Bulk {next(self.serial)}'} for _ in items
+            ], format='json'),
+            grow_items
+        )
+
+    def test_tag_actions(self):
+        """test listing and creating tags"""
+        self.check_actions(Tag)
+
+    def test_ingredient_actions(self):
+        """test listing and creating ingredients"""
+        self.check_actions(Ingredient)
@@ -1,16 +1,24 @@
 import tempfile
 import os
+from unittest.mock import patch
 
 from PIL import Image
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
 
+from recipe import images
+from recipe.pagination import RecipeCursorPagination
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 from rest_framework import status
 
@@ -50,6 +58,28 @@ def sample_recipe(user, **params):
     return Recipe.objects.create(user=user, **defaults)
 
 
+def sample_full_recipe(user, index):
+    """create a recipe with its own tag and ingredient attached"""
+    recipe = sample_recipe(user=user, title=f'Recipe {index}')
+    recipe.tags.add(sample_tag(user=user, name=f'Tag {index}'))
+    recipe.ingredients.add(
+        sample_ingredient(user=user, name=f'Ingredient {index}')
+    )
+
+    return recipe
+
+
+def count_queries(client, url):
+    """return the number of queries issued while fetching the url"""
+    client.get(url)
+    cache.clear()
+    with CaptureQueriesContext(connection) as ctx:
+        res = client.get(url)
+
+    assert res.status_code == status.HTTP_200_OK
+    return len(ctx.captured_queries)
+
+
 class PublicRecipeApiTests(TestCase):
     """Test authenticated recipe API access"""
 
@@ -84,7 +114,7 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipes_limited_to_user(self):
         """TEst retrieving recipes for user"""
@@ -100,8 +130,8 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.filter(user=self.user)
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_view_recipe_detail(self):
         """Test viewing a recipe detail"""
@@ -167,6 +197,131 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_create_recipe_reports_unknown_links(self):
+        """test every unknown or foreign id is reported at once"""
+        other = get_user_model().objects.create_user(
+            'other@yahoo.com',
+            'testing1234'
+        )
+        tag = sample_tag(user=self.user)
+        foreign = sample_tag(user=other, name='Theirs')
+        payload = {
+            'title': 'Mango with chocolate',
+            'tags': [tag.id, foreign.id, 9999],
+            'time_minutes': 60,
+            'price': 20.00
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data['tags']), 2)
+        self.assertIn(str(foreign.id), res.data['tags'][0])
+        self.assertIn('9999', res.data['tags'][1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_create_recipe_rejects_bad_ids(self):
+        """test ids of the wrong type are rejected"""
+        payload = {
+            'title': 'Mango with chocolate',
+            'tags': [True],
+            'time_minutes': 60,
+            'price': 20.00
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data)
+
+    def test_create_recipe_with_named_links(self):
+        """test tags and ingredients given by name are found or created"""
+        tag = sample_tag(user=self.user, name='Dessert')
+        other = get_user_model().objects.create_user(
+            'other@yahoo.com',
+            'testing1234'
+        )
+        sample_tag(user=other, name='Vegan')
+        payload = {
+            'title': 'Mango with chocolate',
+            'tags': [tag.id, 'Dessert', 'Vegan', {'name': 'Vegan'}],
+            'ingredients': ['Mango'],
+            'time_minutes': 60,
+            'price': 20.00
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)),
+            ['Dessert', 'Vegan']
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        ingredient = recipe.ingredients.get()
+        self.assertEqual(
+            (ingredient.name, ingredient.user), ('Mango', self.user)
+        )
+        self.assertEqual(
+            sorted(res.data['tags']),
+            sorted(recipe.tags.values_list('id', flat=True))
+        )
+
+    def test_numeric_names_need_name_form(self):
+        """test a string of digits is an id and {"name": ...} a name"""
+        tag = sample_tag(user=self.user, name='Dessert')
+        payload = {
+            'title': 'Mango with chocolate',
+            'tags': [str(tag.id), {'name': '20240101'}],
+            'ingredients': [],
+            'time_minutes': 60,
+            'price': 20.00
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)),
+            ['20240101', 'Dessert']
+        )
+
+        payload['tags'] = ['20240101']
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            res.data['tags'],
+            ['Invalid pk "20240101" - object does not exist.']
+        )
+
+    def test_create_recipe_rejects_bad_names(self):
+        """test blank and overlong names are rejected"""
+        for name in (' ', 'x' * 256, {'name': 5}):
+            payload = {
+                'title': 'Mango with chocolate',
+                'tags': [name],
+                'time_minutes': 60,
+                'price': 20.00
+            }
+            res = self.client.post(RECIPES_URL, payload, format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('tags', res.data)
+        self.assertFalse(Tag.objects.exists())
+
+    def test_update_recipe_with_named_links(self):
+        """test updating a recipe links tags given by name"""
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(sample_tag(user=self.user))
+
+        res = self.client.patch(
+            detail_url(recipe.id), {'tags': ['Curry']}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(recipe.tags.values_list('name', flat=True)), ['Curry']
+        )
+
     def test_partial_update(self):
         """test updating with recipe with patch"""
         recipe = sample_recipe(user=self.user)
@@ -202,8 +357,73 @@ class PrivateRecipeApiTests(TestCase):
         tags = recipe.tags.all()
         self.assertEqual(len(tags), 0)
 
+    def test_list_query_count_constant(self):
+        """test listing recipes does not issue queries per recipe"""
+        sample_full_recipe(self.user, 0)
+        baseline = count_queries(self.client, RECIPES_URL)
+
+        for index in range(1, 6):
+            sample_full_recipe(self.user, index)
+
+        self.assertEqual(count_queries(self.client, RECIPES_URL), baseline)
+
+    def test_detail_query_count_constant(self):
+        """test recipe detail cost does not grow with tags/ingredients"""
+        recipe = sample_full_recipe(self.user, 0)
+        baseline = count_queries(self.client, detail_url(recipe.id))
+
+        for index in range(1, 6):
+            recipe.tags.add(sample_tag(user=self.user, name=f'Extra {index}'))
+            recipe.ingredients.add(
+                sample_ingredient(user=self.user, name=f'Extra {index}')
+            )
+
+        self.assertEqual(
+            count_queries(self.client, detail_url(recipe.id)),
+            baseline
+        )
+
+    def test_list_paginated_by_cursor(self):
+        """test recipes are paged newest first using opaque cursors"""
+        recipes = [
+            sample_recipe(user=self.user, title=f'Recipe {index}')
+            for index in range(3)
+        ]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in res.data['results']],
+            [recipes[2].id, recipes[1].id]
+        )
+        self.assertIn('cursor=', res.data['next'])
+        self.assertIsNone(res.data['previous'])
+
+        sample_recipe(user=self.user, title='Inserted meanwhile')
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(
+            [item['id'] for item in res.data['results']],
+            [recipes[0].id]
+        )
+        self.assertIsNone(res.data['next'])
+
+    @patch.object(RecipeCursorPagination, 'max_page_size', 2)
+    def test_page_size_capped(self):
+        """test the requested page size cannot exceed the maximum"""
+        for index in range(3):
+            sample_recipe(user=self.user, title=f'Recipe {index}')
+
+        res = self.client.get(RECIPES_URL, {'page_size': 100})
 
-class RecipeImageUploadTests(TestCase):
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+
+
+class RecipeImageUploadTests(TransactionTestCase):
+    """test uploading recipe images, whose derivatives are handled once the
+    upload is committed"""
 
     def setUp(self):
         self.client = APIClient()
@@ -215,6 +435,8 @@ class RecipeImageUploadTests(TestCase):
         self.recipe = sample_recipe(user=self.user)
 
     def tearDown(self):
+        if self.recipe.image:
+            images.delete_derivatives(self.recipe.image.name)
         self.recipe.image.delete()
 
     def test_upload_image_to_recipe(self):
@@ -231,6 +453,102 @@ class RecipeImageUploadTests(TestCase):
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    @override_settings(RECIPE_IMAGE_ASYNC=False)
+    def test_upload_image_generates_derivatives(self):
+        """test size bounded derivatives are written for an upload"""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpeg') as ntf:
+            img = Image.new('RGB', (2000, 1000))
+            img.save(ntf, format='JPEG')
+            ntf.seek(0)
+            self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            set(self.recipe.image_derivatives),
+            set(settings.RECIPE_IMAGE_DERIVATIVES)
+        )
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertEqual(
+            set(res.data['images']),
+            set(settings.RECIPE_IMAGE_DERIVATIVES)
+        )
+        for size, bound in settings.RECIPE_IMAGE_DERIVATIVES.items():
+            name = images.derivative_name(self.recipe.image.name, size)
+            with default_storage.open(name) as derivative:
+                self.assertLessEqual(max(Image.open(derivative).size), bound)
+
+    def upload(self, size=(10, 10)):
+        """upload a generated jpeg as the recipe image"""
+        with tempfile.NamedTemporaryFile(suffix='.jpeg') as ntf:
+            Image.new('RGB', size).save(ntf, format='JPEG')
+            ntf.seek(0)
+            return self.client.post(
+                image_upload_url(self.recipe.id), {'image': ntf},
+                format='multipart'
+            )
+
+    @override_settings(RECIPE_IMAGE_ASYNC=False)
+    def test_pending_derivatives_not_listed(self):
+        """test derivatives are only listed once they are written, and
+        responses read before that are not served again"""
+        with patch('recipe.images.schedule_derivatives'):
+            self.upload()
+        self.recipe.refresh_from_db()
+
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertEqual(res.data['images'], {})
+
+        images.schedule_derivatives(
+            self.recipe.id, self.recipe.image.name, self.user.id
+        )
+        again = self.client.get(
+            detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=res['ETag']
+        )
+
+        self.assertEqual(again.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(again.data['images']),
+            set(settings.RECIPE_IMAGE_DERIVATIVES)
+        )
+
+    @override_settings(RECIPE_IMAGE_ASYNC=False)
+    def test_replaced_image_derivatives_deleted(self):
+        """test uploading a new image deletes the old one's derivatives"""
+        self.upload()
+        self.recipe.refresh_from_db()
+        previous = self.recipe.image.name
+        self.addCleanup(default_storage.delete, previous)
+
+        self.upload()
+
+        for size in settings.RECIPE_IMAGE_DERIVATIVES:
+            self.assertFalse(default_storage.exists(
+                images.derivative_name(previous, size)
+            ))
+
+    def test_derivatives_read_from_recipe(self):
+        """test derivative urls come from the recipe, not storage lookups"""
+        self.recipe.image = 'uploads/recipe/adobo.jpg'
+        self.recipe.image_derivatives = ['thumbnail']
+        self.recipe.save()
+
+        with patch.object(default_storage, 'exists') as exists:
+            res = self.client.get(detail_url(self.recipe.id))
+            listed = self.client.get(RECIPES_URL)
+
+        exists.assert_not_called()
+        self.assertEqual(list(res.data['images']), ['thumbnail'])
+        self.assertEqual(
+            listed.data['results'][0]['images'], res.data['images']
+        )
+
+    def test_recipe_without_image_has_no_derivatives(self):
+        """test recipes without an image expose no derivative urls"""
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertIsNone(res.data['images'])
+
     def test_upload_image_bad_request(self):
         """test uploading as invalid image"""
         url = image_upload_url(self.recipe.id)
@@ -256,9 +574,9 @@ class RecipeImageUploadTests(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipes_by_ingredients(self):
         """test return recipes with specific ingredients"""
@@ -278,6 +596,42 @@ class RecipeImageUploadTests(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
+
+    def test_filter_recipes_returns_unique_items(self):
+        """test recipes matching several tags are returned once"""
+        recipe = sample_recipe(user=self.user, title='Halo-halo')
+        tag1 = sample_tag(user=self.user, name='Dessert')
+        tag2 = sample_tag(user=self.user, name='Cold')
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_filter_recipes_match_all(self):
+        """test match=all returns only recipes having every tag"""
+        recipe1 = sample_recipe(user=self.user, title='Leche flan')
+        recipe2 = sample_recipe(user=self.user, title='Ice candy')
+        tag1 = sample_tag(user=self.user, name='Dessert')
+        tag2 = sample_tag(user=self.user, name='Baked')
+        recipe1.tags.add(tag1, tag2)
+        recipe2.tags.add(tag1)
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'tags': f'{tag1.id},{tag2.id}', 'match': 'all'}
+        )
+
+        self.assertEqual(
+            res.data['results'],
+            [RecipeSerializer(recipe1).data]
+        )
+
+    def test_filter_recipes_invalid_match(self):
+        """test an unknown match mode is rejected"""
+        res = self.client.get(RECIPES_URL, {'tags': '1', 'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,58 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.test import TestCase
+
+from core.models import Tag
+
+from recipe.relations import save_named
+
+
+class SaveNamedTests(TestCase):
+    """test storing objects given by name"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'aljon@yahoo.com',
+            'testing1234'
+        )
+
+    def test_existing_and_missing_names(self):
+        """test stored names are reused and missing ones created once"""
+        stored = Tag.objects.create(user=self.user, name='Dinner')
+        groups = [
+            [Tag(name='Dinner'), Tag(name='Vegan')],
+            [Tag(name='Vegan'), stored],
+        ]
+
+        with self.assertNumQueries(4):
+            groups = save_named(Tag, self.user, groups)
+
+        vegan = Tag.objects.get(user=self.user, name='Vegan')
+        self.assertEqual(groups, [[stored, vegan], [vegan, stored]])
+
+    def test_concurrently_created_name(self):
+        """test a name created by another request since the lookup is
+        used instead of failing"""
+        calls = []
+
+        def bulk_create(objects):
+            calls.append(objects)
+            if len(calls) == 1:
+                Tag.objects.create(user=self.user, name='Vegan')
+                raise IntegrityError('duplicate key')
+            return real_bulk_create(objects)
+
+        real_bulk_create = Tag.objects.bulk_create
+        with patch.object(Tag.objects, 'bulk_create', bulk_create):
+            groups = save_named(Tag, self.user, [[
+                Tag(name='Vegan'), Tag(name='Dinner')
+            ]])
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(
+            [(tag.name, tag.user) for tag in groups[0]],
+            [('Vegan', self.user), ('Dinner', self.user)]
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
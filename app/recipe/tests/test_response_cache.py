@@ -0,0 +1,130 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+from recipe import cache
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+CACHE_STATS_URL = reverse('recipe:cache-stats')
+
+
+def detail_url(recipe_id):
+    """return recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ResponseCacheTests(TestCase):
+    """test caching recipe responses per user"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'aljon@yahoo.com',
+            'testing1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Sinigang',
+            time_minutes=40,
+            price=9.00
+        )
+        caches['default'].clear()
+
+    def tearDown(self):
+        caches['default'].clear()
+
+    def test_list_served_from_cache(self):
+        """test a repeated list only looks up the collection version"""
+        self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['title'], 'Sinigang')
+        self.assertEqual(cache.stats()['hit'], 1)
+        self.assertEqual(cache.stats()['miss'], 1)
+
+    def test_detail_served_from_cache(self):
+        """test a repeated detail only looks up the collection version"""
+        self.client.get(detail_url(self.recipe.id))
+
+        with self.assertNumQueries(1):
+            res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(res.data['id'], self.recipe.id)
+
+    def test_id_lists_normalised(self):
+        """test reordered tag ids share a cache entry"""
+        self.client.get(RECIPES_URL, {'tags': '2,1'})
+        self.client.get(RECIPES_URL, {'tags': '1,2'})
+
+        self.assertEqual(cache.stats()['hit'], 1)
+
+    def test_repeated_params_keyed_by_last_value(self):
+        """test a repeated list parameter is keyed by the value the view
+        filters by, not by every value given"""
+        tag = Tag.objects.create(user=self.user, name='Soup')
+        self.recipe.tags.add(tag)
+
+        self.client.get(RECIPES_URL, {'tags': f'{tag.id},{tag.id + 1}'})
+        res = self.client.get(RECIPES_URL, {'tags': [tag.id, tag.id + 1]})
+
+        self.assertEqual(cache.stats()['hit'], 0)
+        self.assertEqual(res.data['results'], [])
+
+    def test_write_bypasses_cache(self):
+        """test changing a recipe stops the user's cached responses being
+        served"""
+        self.client.get(RECIPES_URL)
+
+        self.recipe.title = 'Sinigang na hipon'
+        self.recipe.save()
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'][0]['title'], 'Sinigang na hipon')
+        self.assertEqual(cache.stats(), {'hit': 0, 'miss': 2, 'evict': 1})
+
+    def test_link_change_bypasses_cache(self):
+        """test linking a tag stops the user's cached responses being
+        served"""
+        url = detail_url(self.recipe.id)
+        self.client.get(url)
+
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Soup'))
+        res = self.client.get(url)
+
+        self.assertEqual(res.data['tags'][0]['name'], 'Soup')
+
+    def test_cache_limited_to_user(self):
+        """test users never see each other's cached responses"""
+        self.client.get(RECIPES_URL)
+        other = get_user_model().objects.create_user(
+            'other@yahoo.com',
+            'testing1234'
+        )
+        self.client.force_authenticate(other)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_stats_require_staff(self):
+        """test the cache counters are only exposed to staff"""
+        res = self.client.get(CACHE_STATS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        res = self.client.get(CACHE_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(res.data), {'hit', 'miss', 'evict'})
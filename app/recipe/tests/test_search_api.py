@@ -0,0 +1,129 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from core.search import trigram_available
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def sample_recipe(user, title):
+    """create and return a sample recipe"""
+    return Recipe.objects.create(
+        user=user,
+        title=title,
+        time_minutes=10,
+        price=5.00
+    )
+
+
+class RecipeSearchApiTests(TestCase):
+    """test searching recipes by title, tag and ingredient names"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'aljon@yahoo.com',
+            'testing1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def search(self, term):
+        """return the titles of the recipes matching the term"""
+        res = self.client.get(RECIPES_URL, {'search': term})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [item['title'] for item in res.data['results']]
+
+    def test_search_by_title(self):
+        """test recipes are matched on stemmed title words"""
+        sample_recipe(self.user, 'Grilled chicken skewers')
+        sample_recipe(self.user, 'Beef stew')
+
+        self.assertEqual(self.search('skewer'), ['Grilled chicken skewers'])
+
+    def test_search_by_tag_and_ingredient(self):
+        """test recipes are matched on linked tag and ingredient names"""
+        recipe1 = sample_recipe(self.user, 'Adobo')
+        recipe1.tags.add(Tag.objects.create(user=self.user, name='Filipino'))
+        recipe2 = sample_recipe(self.user, 'Sinigang')
+        recipe2.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Tamarind')
+        )
+
+        self.assertEqual(self.search('filipino'), ['Adobo'])
+        self.assertEqual(self.search('tamarind'), ['Sinigang'])
+
+    def test_search_ranks_title_first(self):
+        """test title matches rank above ingredient matches"""
+        garlic = Ingredient.objects.create(user=self.user, name='Garlic')
+        sample_recipe(self.user, 'Fried rice').ingredients.add(garlic)
+        sample_recipe(self.user, 'Garlic bread')
+
+        self.assertEqual(self.search('garlic'), ['Garlic bread', 'Fried rice'])
+
+    def test_search_follows_renames_and_deletes(self):
+        """test the stored search vector tracks tag changes"""
+        tag = Tag.objects.create(user=self.user, name='Spicy')
+        sample_recipe(self.user, 'Bicol express').tags.add(tag)
+
+        tag.name = 'Hot'
+        tag.save()
+        self.assertEqual(self.search('spicy'), [])
+        self.assertEqual(self.search('hot'), ['Bicol express'])
+
+        tag.delete()
+        self.assertEqual(self.search('hot'), [])
+
+    def test_search_limited_to_user(self):
+        """test other users' recipes are not searched"""
+        other = get_user_model().objects.create_user(
+            'other@yahoo.com',
+            'testing1234'
+        )
+        sample_recipe(other, 'Pancit canton')
+
+        self.assertEqual(self.search('pancit'), [])
+
+    def test_search_paginated_by_rank(self):
+        """test ranked search results page without repeats"""
+        for index in range(3):
+            sample_recipe(self.user, f'Lumpia {index}')
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'search': 'lumpia', 'page_size': 2}
+        )
+        ids = [item['id'] for item in res.data['results']]
+        res = self.client.get(res.data['next'])
+        ids += [item['id'] for item in res.data['results']]
+
+        self.assertEqual(len(set(ids)), 3)
+
+    def test_bulk_created_recipes_searchable(self):
+        """test recipes created in bulk get a search vector"""
+        payload = [{
+            'title': 'Halo-halo',
+            'time_minutes': 5,
+            'price': '3.00',
+            'tags': [],
+            'ingredients': [],
+        }]
+        self.client.post(
+            reverse('recipe:recipe-bulk'), payload, format='json'
+        )
+
+        self.assertEqual(self.search('halo'), ['Halo-halo'])
+
+    def test_search_tolerates_typos(self):
+        """test misspelt terms still match similar names"""
+        if not trigram_available():
+            self.skipTest('pg_trgm is not installed')
+        sample_recipe(self.user, 'Chicken inasal')
+
+        self.assertEqual(self.search('chiken inasal'), ['Chicken inasal'])
@@ -0,0 +1,84 @@
+from io import StringIO
+from itertools import count
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+
+from core.models import Recipe, Tag
+
+from recipe.management.commands.benchmark_api import Command, percentile
+
+
+class SeedDataTests(TestCase):
+    """test generating benchmark data"""
+
+    def seed(self, **options):
+        call_command(
+            'seed_data', users=2, recipes=20, tags=15, ingredients=30,
+            stdout=StringIO(), **options
+        )
+
+    def test_seed_data(self):
+        """test users get their own tags, ingredients and linked recipes"""
+        self.seed()
+
+        users = get_user_model().objects.filter(email__startswith='bench-')
+        self.assertEqual(users.count(), 2)
+        user = users.get(email='bench-user-0@example.com')
+        self.assertTrue(user.check_password('benchmark'))
+        self.assertEqual(Tag.objects.filter(user=user).count(), 15)
+        self.assertEqual(Recipe.objects.filter(user=user).count(), 20)
+
+        recipes = Recipe.objects.annotate(
+            tag_count=Count('tags', distinct=True),
+            ingredient_count=Count('ingredients', distinct=True)
+        )
+        for recipe in recipes:
+            self.assertTrue(1 <= recipe.tag_count <= 5)
+            self.assertTrue(1 <= recipe.ingredient_count <= 12)
+            self.assertIsNotNone(recipe.search_vector)
+
+    def test_seed_data_reproducible(self):
+        """test the same seed generates the same data after clearing"""
+        self.seed(seed=7)
+        first = list(Recipe.objects.order_by('id').values_list(
+            'title', 'time_minutes', 'price'
+        ))
+
+        self.seed(seed=7, clear=True)
+        second = list(Recipe.objects.order_by('id').values_list(
+            'title', 'time_minutes', 'price'
+        ))
+
+        self.assertEqual(first, second)
+
+    def test_percentile(self):
+        """test the nearest rank percentile used in reports"""
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3], 95), 3)
+
+    def test_reads_unique_per_request(self):
+        """test benchmark reads are not answered by the response cache
+        unless cached reads are asked for"""
+        command = Command()
+        command.cached, command.run_id = False, 'run'
+        command.serial = count()
+
+        self.assertEqual(
+            command.read_path('/api/recipe/recipes/', {'tags': '1'}),
+            '/api/recipe/recipes/?tags=1&benchmark=run-0'
+        )
+        self.assertNotEqual(
+            command.read_path('/api/recipe/recipes/'),
+            command.read_path('/api/recipe/recipes/')
+        )
+
+        command.cached = True
+        self.assertEqual(
+            command.read_path('/api/recipe/recipes/'), '/api/recipe/recipes/'
+        )
@@ -47,7 +47,7 @@ class PrivateTagsApiTests(TestCase):
         tags = Tag.objects.all().order_by('-name')
         serializer = TagSerializer(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """Test that tags returned are for the authenticated user"""
@@ -61,8 +61,8 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
 
     def test_create_tag_succesful(self):
         """testing creating a new tag"""
@@ -98,8 +98,8 @@ class PrivateTagsApiTests(TestCase):
 
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrieve_tags_assigned_unique(self):
         """test filtering tags by assigned returns unique items"""
@@ -122,4 +122,78 @@ class PrivateTagsApiTests(TestCase):
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_tags_paginated_by_name(self):
+        """test tags are paged by descending name"""
+        for name in ('Apple', 'Banana', 'Cherry'):
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        names = [item['name'] for item in res.data['results']]
+        res = self.client.get(res.data['next'])
+        names += [item['name'] for item in res.data['results']]
+
+        self.assertEqual(names, ['Cherry', 'Banana', 'Apple'])
+        self.assertIsNone(res.data['next'])
+
+    def test_create_tag_duplicate_name(self):
+        """test a user cannot create two tags with the same name"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_create_tag_name_used_by_other_user(self):
+        """test tag names only need to be unique per user"""
+        user2 = get_user_model().objects.create_user(
+            'othermendiola@yahoo.com',
+            'testing1234'
+        )
+        Tag.objects.create(user=user2, name='Vegan')
+
+        res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_retrieve_tags_with_counts(self):
+        """test tags can include the number of recipes using them"""
+        tag1 = Tag.objects.create(user=self.user, name='Breakfast')
+        Tag.objects.create(user=self.user, name='Lunch')
+        for title in ('Pancakes', 'Tapsilog'):
+            recipe = Recipe.objects.create(
+                title=title,
+                time_minutes=5,
+                price=3.00,
+                user=self.user
+            )
+            recipe.tags.add(tag1)
+
+        res = self.client.get(TAGS_URL, {'with_counts': 1})
+
+        counts = {
+            item['name']: item['recipe_count']
+            for item in res.data['results']
+        }
+        self.assertEqual(counts, {'Lunch': 0, 'Breakfast': 2})
+
+    def test_retrieve_assigned_tags_with_counts(self):
+        """test counts combine with assigned_only"""
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        Tag.objects.create(user=self.user, name='Snacks')
+        recipe = Recipe.objects.create(
+            title='Bulalo',
+            time_minutes=90,
+            price=12.00,
+            user=self.user
+        )
+        recipe.tags.add(tag)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1, 'with_counts': 1})
+
+        self.assertEqual(
+            res.data['results'],
+            [{'id': tag.id, 'name': 'Dinner', 'recipe_count': 1}]
+        )
@@ -0,0 +1,122 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ValuesReadTests(TestCase):
+    """test recipes read as values match the serializers byte for byte"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'aljon@yahoo.com',
+            'testing1234'
+        )
+        self.client.force_authenticate(self.user)
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Dessert', 'Dinner')
+        ]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ('Mango', 'Chocolate')
+        ]
+        self.recipes = []
+        for index in range(4):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Mango dessert {index}',
+                time_minutes=10 + index,
+                price='0.50' if index else '120.00',
+                link='https://example.com' if index % 2 else ''
+            )
+            # Linked out of id order, which both paths must not reflect.
+            recipe.tags.add(*reversed(tags[:index]))
+            recipe.ingredients.add(*ingredients[index % 2:])
+            self.recipes.append(recipe)
+
+    def assertSameContent(self, url, params=None):
+        """assert both read paths answer the request with the same bytes"""
+        contents = []
+        for values_reads in (True, False):
+            for cache in caches.all():
+                cache.clear()
+            with self.settings(RECIPE_VALUES_READS=values_reads):
+                res = self.client.get(url, params or {})
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            contents.append(res.content)
+
+        self.assertEqual(contents[0], contents[1])
+        return contents[0]
+
+    def test_list_matches_serializer(self):
+        """test the recipe list matches RecipeSerializer"""
+        self.assertSameContent(RECIPES_URL)
+
+    def test_list_pages_match_serializer(self):
+        """test paginated, filtered and searched lists match"""
+        tag = Tag.objects.get(name='Vegan')
+        self.assertSameContent(RECIPES_URL, {'page_size': 2})
+        self.assertSameContent(RECIPES_URL, {'tags': tag.id})
+        self.assertSameContent(RECIPES_URL, {'search': 'mango'})
+
+    def test_detail_matches_serializer(self):
+        """test the recipe detail matches RecipeDetailSerializer"""
+        for recipe in self.recipes:
+            self.assertSameContent(detail_url(recipe.id))
+
+    def test_image_urls_match_serializer(self):
+        """test the image derivative urls match"""
+        recipe = self.recipes[1]
+        recipe.image = 'uploads/recipe/mango.jpg'
+        recipe.save()
+
+        content = self.assertSameContent(detail_url(recipe.id))
+        self.assertIn(b'"images":{', content)
+        self.assertSameContent(RECIPES_URL)
+
+    def test_sparse_fields_match_serializer(self):
+        """test trimmed and expanded representations match"""
+        for params in (
+                {'fields': 'id,title'},
+                {'fields': 'price,tags,images'},
+                {'expand': 'tags'},
+                {'expand': 'tags,ingredients', 'fields': 'title,tags'}):
+            self.assertSameContent(RECIPES_URL, params)
+            self.assertSameContent(detail_url(self.recipes[2].id), params)
+
+    def test_malformed_id(self):
+        """test a non numeric id is not found on both read paths"""
+        for values_reads in (True, False):
+            with self.settings(RECIPE_VALUES_READS=values_reads):
+                res = self.client.get(RECIPES_URL + 'abc/')
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unknown_recipe(self):
+        """test another user's recipe is not found"""
+        other = get_user_model().objects.create_user(
+            'other@yahoo.com',
+            'testing1234'
+        )
+        recipe = Recipe.objects.create(
+            user=other, title='Theirs', time_minutes=5, price=1
+        )
+
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -12,5 +12,10 @@ router.register('recipes', views.RecipeViewSet)
 app_name = 'recipe'
 
 urlpatterns = [
-    path('', include(router.urls))
+    path('', include(router.urls)),
+    path(
+        'cache-stats/',
+        views.ResponseCacheStatsView.as_view(),
+        name='cache-stats'
+    ),
 ]
@@ -1,21 +1,44 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
 
+from core.metrics import serializing
 from core.models import Tag, Ingredient, Recipe
+from core.routers import ReplicaReadMixin, reading_lazily
+from core.signals import deferred_collection_changes, \
+                         refresh_recipe_search
+from user.authentication import CachedTokenAuthentication
 
-from recipe import serializers
+from recipe import cache, export, filters, images, rows, serializers
+from recipe.mixins import BulkModelMixin, CachedResponseMixin, \
+                          ConditionalGetMixin
+from recipe.pagination import RecipeCursorPagination, \
+                              RecipeAttrCursorPagination
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+class BaseRecipeAttrViewSet(ReplicaReadMixin,
+                            ConditionalGetMixin,
+                            BulkModelMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin
                             ):
     """base viewset for managing ingredients in database"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeAttrCursorPagination
 
     def get_queryset(self):
         """return objects for current authenticated user only"""
@@ -24,53 +47,225 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
         )
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = filters.assigned_only(queryset)
+        if self._with_counts():
+            queryset = filters.with_recipe_counts(queryset)
 
         return queryset.filter(
             user=self.request.user
-            ).order_by('-name').distinct()
+            ).order_by('-name')
+
+    def _with_counts(self):
+        """return whether recipe usage counts were requested"""
+        return self.request.query_params.get('with_counts') == '1'
+
+    def get_serializer_class(self):
+        """return the serializer including usage counts when requested"""
+        if self.action == 'list' and self._with_counts():
+            return self.count_serializer_class
+
+        return self.serializer_class
 
     def perform_create(self, serializer):
         """create a new object"""
-        serializer.save(user=self.request.user)
+        with transaction.atomic(savepoint=False), \
+                deferred_collection_changes():
+            serializer.save(user=self.request.user)
+
+    def get_bulk_serializer_context(self, items):
+        """add the ids of the user's objects named in the payload"""
+        context = super().get_bulk_serializer_context(items)
+        names = {
+            item['name'].strip() for item in items
+            if isinstance(item, dict) and isinstance(item.get('name'), str)
+        }
+        context['existing_names'] = dict(
+            self.get_bulk_queryset().filter(name__in=names)
+            .values_list('name', 'pk')
+        ) if names else {}
+
+        return context
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
     """manage tags in database"""
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    count_serializer_class = serializers.TagCountSerializer
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
     """manage ingredient in database"""
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    count_serializer_class = serializers.IngredientCountSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin,
+                    ConditionalGetMixin,
+                    CachedResponseMixin,
+                    BulkModelMixin,
+                    viewsets.ModelViewSet):
     """manage recipes in database"""
     queryset = Recipe.objects.all()
     serializer_class = serializers.RecipeSerializer
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeCursorPagination
 
     def _params_to_ints(self, qs):
         """convert a list of string IDs to alist of integer"""
-        return [int(str_id) for str_id in qs.split(',')]
+        try:
+            return [int(str_id) for str_id in qs.split(',')]
+        except ValueError:
+            raise ValidationError({'detail': 'IDs must be integers.'})
+
+    def _params_to_names(self, name, choices):
+        """return the names in a comma separated query parameter, in the
+        order of choices, or None when the parameter is empty"""
+        value = self.request.query_params.get(name, '')
+        if not value.strip():
+            return None
+
+        names = {item.strip() for item in value.split(',') if item.strip()}
+        unknown = names.difference(choices)
+        if unknown:
+            raise ValidationError(
+                {name: f'Unknown fields: {", ".join(sorted(unknown))}.'}
+            )
+
+        return tuple(choice for choice in choices if choice in names)
+
+    def get_requested_fields(self):
+        """return the fields to represent, all unless ?fields= trims them"""
+        fields = self._params_to_names('fields', rows.FIELDS)
+        return rows.FIELDS if fields is None else fields
+
+    def get_expanded_fields(self):
+        """return the requested relations to represent as objects"""
+        if self.action == 'retrieve':
+            expand = rows.RELATIONS
+        else:
+            expand = self._params_to_names('expand', rows.RELATIONS) or ()
+
+        fields = self.get_requested_fields()
+        return tuple(field for field in expand if field in fields)
+
+    def get_serializer_context(self):
+        """add the requested fields and expansions of reads"""
+        context = super().get_serializer_context()
+        if self.action in ('list', 'retrieve'):
+            context['fields'] = self.get_requested_fields()
+            context['expand'] = self.get_expanded_fields()
+
+        return context
 
     def get_queryset(self):
         """Retriecve the recipe for the authenticated users"""
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
+        match = self.request.query_params.get('match', filters.MATCH_ANY)
+        if match not in filters.MATCH_CHOICES:
+            raise ValidationError({'match': 'Must be "any" or "all".'})
+
         queryset = self.queryset
         if tags:
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = filters.filter_by_related(
+                queryset, 'tags', tag_ids, match
+            )
         if ingredients:
             ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+            queryset = filters.filter_by_related(
+                queryset, 'ingredients', ingredient_ids, match
+            )
+
+        term = self.request.query_params.get('search', '').strip()
+        if term:
+            queryset = filters.search(queryset, term)
 
-        return queryset.filter(user=self.request.user)
+        queryset = queryset.filter(user=self.request.user).order_by('-id')
+
+        return self._prefetch_for_action(queryset)
+
+    def _prefetch_for_action(self, queryset):
+        """load only the columns and relations the action's serializer
+        reads"""
+        if self.action in ('list', 'retrieve'):
+            fields = self.get_requested_fields()
+            expand = self.get_expanded_fields()
+            prefetches = []
+            for field, model in (('tags', Tag), ('ingredients', Ingredient)):
+                if field not in fields:
+                    continue
+                related = model.objects.order_by('id')
+                if field not in expand:
+                    related = related.only('id')
+                prefetches.append(Prefetch(field, queryset=related))
+
+            return queryset.only(*rows.columns(fields)) \
+                .prefetch_related(*prefetches)
+        elif self.action == 'upload_image':
+            return queryset.only('id', 'user', 'image', 'image_derivatives')
+
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if not settings.RECIPE_VALUES_READS:
+            return super().list(request, *args, **kwargs)
+
+        handler = partial(self.cached_response, self.list_values)
+        return self.conditional_response(handler, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        handler = partial(
+            self.cached_response,
+            self.retrieve_values if settings.RECIPE_VALUES_READS
+            else super().retrieve
+        )
+        return self.conditional_response(handler, request, *args, **kwargs)
+
+    def list_values(self, request, *args, **kwargs):
+        """list recipes read as values rather than through the serializer"""
+        fields = self.get_requested_fields()
+        expand = self.get_expanded_fields()
+        queryset = rows.select(
+            self.filter_queryset(self.get_queryset()), fields, expand
+        )
+        represent = rows.representer(fields, expand)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            with serializing():
+                data = [represent(row) for row in page]
+            return self.get_paginated_response(data)
+
+        queryset = list(queryset)
+        with serializing():
+            data = [represent(row) for row in queryset]
+        return Response(data)
+
+    def retrieve_values(self, request, *args, **kwargs):
+        """show a recipe read as values rather than through the
+        serializer"""
+        fields = self.get_requested_fields()
+        expand = self.get_expanded_fields()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            rows.select(
+                self.filter_queryset(self.get_queryset()), fields, expand
+            ),
+            **{self.lookup_field: kwargs[lookup_url_kwarg]}
+        )
+        self.check_object_permissions(request, row)
+
+        with serializing():
+            data = rows.representer(fields, expand)(row)
+        return Response(data)
+
+    def perform_bulk_write(self, objects):
+        """refresh the search vectors of bulk written recipes"""
+        refresh_recipe_search([obj.pk for obj in objects])
 
     def get_serializer_class(self):
         """Return approriate serializer class"""
@@ -82,20 +277,47 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return self.serializer_class
 
     def perform_create(self, serializer):
-        """create a new recipe"""
-        serializer.save(user=self.request.user)
+        """create a new recipe, bumping the version and refreshing its
+        search vector once"""
+        with transaction.atomic(savepoint=False), \
+                deferred_collection_changes():
+            serializer.save(user=self.request.user)
+
+    def perform_update(self, serializer):
+        """update a recipe, bumping the version and refreshing its
+        search vector once"""
+        with transaction.atomic(savepoint=False), \
+                deferred_collection_changes():
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        """delete a recipe, bumping the version once"""
+        with transaction.atomic(savepoint=False), \
+                deferred_collection_changes():
+            instance.delete()
 
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """Upload an image to a recipe"""
         recipe = self.get_object()
+        previous = recipe.image.name
         serializer = self.get_serializer(
             recipe,
             data=request.data
         )
 
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic(savepoint=False), \
+                    deferred_collection_changes():
+                serializer.save(image_derivatives=[])
+                if previous and previous != recipe.image.name:
+                    transaction.on_commit(
+                        partial(images.delete_derivatives, previous)
+                    )
+                transaction.on_commit(partial(
+                    images.schedule_derivatives,
+                    recipe.pk, recipe.image.name, request.user.pk
+                ))
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
@@ -105,3 +327,40 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    @action(
+        methods=['GET'], detail=False,
+        renderer_classes=export.RENDERER_CLASSES +
+        api_settings.DEFAULT_RENDERER_CLASSES
+    )
+    def export(self, request):
+        """Stream the user's recipes as ndjson or csv"""
+        accepted = request.accepted_renderer.format
+        if accepted not in export.CONTENT_TYPES:
+            accepted = 'ndjson'
+        output = request.query_params.get('output', accepted)
+        if output not in export.CONTENT_TYPES:
+            raise ValidationError({'output': 'Must be "ndjson" or "csv".'})
+
+        response = StreamingHttpResponse(
+            reading_lazily(export.stream(
+                self.get_queryset(),
+                output,
+                settings.RECIPE_EXPORT_CHUNK_SIZE
+            )),
+            content_type=export.CONTENT_TYPES[output]
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="recipes.{output}"'
+
+        return response
+
+
+class ResponseCacheStatsView(APIView):
+    """report the recipe response cache counters"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request, format=None):
+        """return the hit and miss counters"""
+        return Response(cache.stats())
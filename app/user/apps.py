@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class UserConfig(AppConfig):
     name = 'user'
+
+    def ready(self):
+        from django.core import checks
+
+        from user import authentication, signals  # noqa
+
+        checks.register(authentication.check_token_cache)
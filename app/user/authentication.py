@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import checks
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.routers import LOCAL_CACHE_BACKENDS
+
+
+class TokenCache:
+    """Thread safe LRU mapping of token keys to user fields with a TTL"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """return the cached user fields for the key or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+
+            return user
+
+    def set(self, key, user):
+        """store the user fields, evicting the least recently used
+        entries"""
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """drop the entry for the key if present"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+token_cache = TokenCache(
+    settings.AUTH_TOKEN_CACHE_MAX_SIZE,
+    settings.AUTH_TOKEN_LOCAL_CACHE_TTL
+)
+
+
+def _shared_cache():
+    """return the shared cache tier, if one is configured"""
+    alias = settings.AUTH_TOKEN_CACHE_ALIAS
+    return caches[alias] if alias else None
+
+
+def _shared_key(key):
+    return f'auth-token:{key}'
+
+
+def check_token_cache(app_configs=None, **kwargs):
+    """report a shared token cache tier that stays in one process"""
+    alias = settings.AUTH_TOKEN_CACHE_ALIAS
+    if not alias or \
+            settings.CACHES[alias]['BACKEND'] not in LOCAL_CACHE_BACKENDS:
+        return []
+
+    return [checks.Error(
+        'The token cache must be shared by every worker, or a deleted '
+        'token keeps working in the others.',
+        hint='Set CACHE_LOCATION, or point AUTH_TOKEN_CACHE_ALIAS at a '
+             'shared cache, or set it empty.',
+        obj='AUTH_TOKEN_CACHE_ALIAS',
+        id='user.E001',
+    )]
+
+
+def user_fields(user):
+    """return the field values of the user that are cached, leaving out
+    the password hash"""
+    return {
+        field.attname: getattr(user, field.attname)
+        for field in user._meta.concrete_fields
+        if field.attname != 'password'
+    }
+
+
+def user_from_fields(fields):
+    """return a user built from cached field values; the password is
+    loaded from the database if it is ever read"""
+    model = get_user_model()
+    return model.from_db(model.objects.db, list(fields), list(fields.values()))
+
+
+def invalidate_token(key):
+    """forget the user resolved for a token in every cache tier"""
+    token_cache.delete(key)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.delete(_shared_key(key))
+
+
+def invalidate_user(user):
+    """forget every token belonging to the user"""
+    keys = Token.objects.filter(user=user).values_list('key', flat=True)
+    for key in keys:
+        invalidate_token(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the token to user lookup
+
+    Users are looked up in the in-process LRU, when enabled, then in the
+    shared Django cache, and only then in the database. Entries are
+    invalidated when the token is deleted or the user is saved; the shared
+    cache sees that at once, in-process entries of other workers only once
+    they expire. Both tiers hold the user's fields without the password
+    hash, and every request gets a user of its own built from them.
+    """
+
+    def authenticate_credentials(self, key):
+        fields = token_cache.get(key)
+        if fields is None:
+            fields = self._get_shared(key)
+            if fields is None:
+                user, token = super().authenticate_credentials(key)
+                fields = user_fields(user)
+                self._set_shared(key, fields)
+            token_cache.set(key, fields)
+
+        user = user_from_fields(fields)
+        return (user, Token(key=key, user=user))
+
+    def _get_shared(self, key):
+        shared = _shared_cache()
+        return shared.get(_shared_key(key)) if shared is not None else None
+
+    def _set_shared(self, key, fields):
+        shared = _shared_cache()
+        if shared is not None:
+            shared.set(
+                _shared_key(key), fields, settings.AUTH_TOKEN_CACHE_TTL
+            )
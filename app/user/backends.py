@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from core import hashing
+
+
+class PooledHashBackend(ModelBackend):
+    """Authenticate with the password checked under the hashing limit
+
+    Only the hashing waits for a slot; passwords stored with an outdated
+    hasher are rehashed.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway so unknown users take as long as known ones.
+            hashing.make_password(password)
+            return None
+
+        if hashing.check_password(user, password) and \
+                self.user_can_authenticate(user):
+            return user
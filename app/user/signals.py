@@ -0,0 +1,19 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from user.authentication import invalidate_token, invalidate_user
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    """stop authenticating with a deleted token"""
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def forget_saved_user(sender, instance, created, **kwargs):
+    """drop cached copies of a user whose account changed"""
+    if not created:
+        invalidate_user(instance)
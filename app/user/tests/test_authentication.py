@@ -0,0 +1,141 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import TokenCache, check_token_cache, token_cache
+
+
+ME_URL = reverse('user:me')
+
+
+class TokenCacheTests(TestCase):
+    """test the in-process token cache"""
+
+    def test_evicts_least_recently_used(self):
+        """test the oldest entry is dropped when the cache is full"""
+        cache = TokenCache(max_size=2, ttl=60)
+        cache.set('a', 'user a')
+        cache.set('b', 'user b')
+        cache.get('a')
+        cache.set('c', 'user c')
+
+        self.assertEqual(cache.get('a'), 'user a')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 'user c')
+
+    @patch('time.monotonic')
+    def test_entries_expire(self, monotonic):
+        """test entries are not returned once their ttl has passed"""
+        cache = TokenCache(max_size=2, ttl=60)
+        monotonic.return_value = 100
+        cache.set('a', 'user a')
+
+        monotonic.return_value = 161
+
+        self.assertIsNone(cache.get('a'))
+
+
+@override_settings(AUTH_TOKEN_CACHE_ALIAS='default')
+class CachedTokenAuthenticationTests(TestCase):
+    """test authenticating requests with cached tokens"""
+
+    def setUp(self):
+        token_cache.clear()
+        caches['default'].clear()
+        self.user = get_user_model().objects.create_user(
+            'aljon@yahoo.com',
+            'testing1234',
+            name='Aljon'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def tearDown(self):
+        token_cache.clear()
+        caches['default'].clear()
+
+    def test_token_lookup_cached(self):
+        """test a repeated request does not query the token table"""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_password_hash_not_cached(self):
+        """test the cached user leaves out the password hash"""
+        self.client.get(ME_URL)
+
+        fields = caches['default'].get(f'auth-token:{self.token.key}')
+
+        self.assertEqual(fields['id'], self.user.pk)
+        self.assertTrue(fields['is_active'])
+        self.assertNotIn('password', fields)
+
+    def test_local_shared_cache_reported(self):
+        """test the system check reports a shared tier in one process"""
+        errors = check_token_cache()
+        self.assertEqual([error.id for error in errors], ['user.E001'])
+
+        with self.settings(AUTH_TOKEN_CACHE_ALIAS=''):
+            self.assertEqual(check_token_cache(), [])
+
+    def test_invalid_token_rejected(self):
+        """test an unknown token is rejected"""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_rejected(self):
+        """test a token stops working once it is deleted"""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """test a deactivated user's cached token stops working"""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_change_by_other_worker_seen(self):
+        """test a user deactivated by another worker is rejected at once"""
+        self.client.get(ME_URL)
+
+        # Another worker deactivates the user; only the shared cache is
+        # invalidated for this one.
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_active=False
+        )
+        caches['default'].delete(f'auth-token:{self.token.key}')
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_invalidates_cache(self):
+        """test updating the user through the API refreshes the cache"""
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {'name': 'New name', 'password': 'new1234'})
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'New name')
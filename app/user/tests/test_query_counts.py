@@ -0,0 +1,82 @@
+import os
+from itertools import count
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.tests.utils import QueryCountMixin
+
+
+CREATE_USER_URL = reverse('user:create')
+TOKEN_URL = reverse('user:token')
+ME_URL = reverse('user:me')
+
+
+class UserQueryCountTests(QueryCountMixin, TestCase):
+    """test every user API action makes a fixed number of queries"""
+    query_baseline = os.path.join(
+        os.path.dirname(__file__), 'query_counts.json'
+    )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'aljon@yahoo.com',
+            'testing1234'
+        )
+        self.serial = count()
+
+    def grow(self, size):
+        """add users that each hold a token"""
+        for _ in range(size):
+            user = get_user_model().objects.create_user(
+                f'user{next(self.serial)}@yahoo.com'
+            )
+            Token.objects.create(user=user)
+
+    def test_user_create(self):
+        """test signing up"""
+        self.assertConstantQueries(
+            'user-create',
+            lambda: self.client.post(CREATE_USER_URL, {
+                'email': f'new{next(self.serial)}@yahoo.com',
+                'password': 'testing1234',
+                'name': 'New',
+            }),
+            self.grow
+        )
+
+    def test_user_token(self):
+        """test logging in"""
+        self.assertConstantQueries(
+            'user-token',
+            lambda: self.client.post(TOKEN_URL, {
+                'email': 'aljon@yahoo.com',
+                'password': 'testing1234',
+            }),
+            self.grow
+        )
+
+    @override_settings(AUTH_TOKEN_CACHE_ALIAS='default')
+    def test_user_me(self):
+        """test viewing the profile with a token"""
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        self.assertConstantQueries(
+            'user-me', lambda: self.client.get(ME_URL), self.grow
+        )
+
+    def test_user_me_update(self):
+        """test updating the profile"""
+        self.client.force_authenticate(self.user)
+
+        self.assertConstantQueries(
+            'user-me-update',
+            lambda: self.client.patch(ME_URL, {'name': 'Renamed'}),
+            self.grow
+        )